@@ -0,0 +1,111 @@
+"""
+Reads frames from a camera on a background thread so the newest frame is
+always ready, instead of waiting on the capture driver every loop.
+"""
+
+import threading
+import cv2
+
+def parseSource(value):
+    """
+    Turns a camera given as text (an environment variable, a request field)
+    into what cv2.VideoCapture takes: a device index for "0", "1", ...,
+    anything else (/dev/video2, a video file, an rtsp:// URL) as a path.
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        return int(value)
+    return value
+
+class cameraStream() :
+    """
+    Wraps cv2.VideoCapture with a reader thread and a single-slot buffer.
+
+    read() always hands back the newest captured frame and waits for a new
+    one if the last frame was already taken, so the consumer never processes
+    the same frame twice. It only fails once the reader has stopped, not
+    while the camera is slow to deliver (warming up, an RTSP hiccup). Frames overwritten before anyone read them are
+    counted in dropped.
+    """
+
+    def __init__(self, src=0, width=None, height=None):
+        self.src = src
+        self.cap = cv2.VideoCapture(src)
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        # Frames are buffered here, so keep the driver's own queue short
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+        self.frame = None
+        self.captured = 0
+        self.dropped = 0
+        self._readId = 0
+        self._running = False
+        self._thread = None
+        self._stop = threading.Event()  # each reader thread gets its own
+        self._cond = threading.Condition()
+
+    def start(self):
+        """
+        Starts the reader thread. Raises RuntimeError if a previous reader is
+        still blocked in the driver, since two must never read one capture.
+        """
+        if self._thread is not None:
+            if self._thread.is_alive() and not self._stop.is_set():
+                return self
+            self._thread.join(timeout=2)
+            if self._thread.is_alive():
+                raise RuntimeError(f"Camera {self.src} is still busy with the previous read")
+        self._stop = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._update, args=(self._stop,), daemon=True)
+        self._thread.start()
+        return self
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def _update(self, stop):
+        while not stop.is_set():
+            ret, frame = self.cap.read()
+            with self._cond:
+                if stop.is_set():
+                    # Stopped while blocked in read(), so the late frame is not handed out
+                    break
+                if not ret:
+                    self._running = False
+                    self._cond.notify_all()
+                    break
+                self.frame = frame
+                self.captured += 1
+                self._cond.notify_all()
+
+    def read(self):
+        """Returns (ret, frame) with the newest frame not yet read, or (False, None) once stopped."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.captured != self._readId or not self._running)
+            if self.captured == self._readId:
+                return False, None
+            self.dropped += self.captured - self._readId - 1
+            self._readId = self.captured
+            return True, self.frame
+
+    def stop(self):
+        """Stops reading but keeps the device open, so start() resumes quickly."""
+        with self._cond:
+            self._running = False
+            self._stop.set()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            # A reader still blocked in the driver is kept, so start() waits for it
+            if not self._thread.is_alive():
+                self._thread = None
+
+    def release(self):
+        self.stop()
+        self.cap.release()
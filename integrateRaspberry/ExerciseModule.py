@@ -0,0 +1,207 @@
+"""
+Turns a declarative exercise spec (joint angles, thresholds, phases, form
+checks and feedback) into a rep-counting state machine.
+"""
+
+import time
+import numpy as np
+
+_OPS = {
+    '>': (1, True),
+    '>=': (1, False),
+    '<': (-1, True),
+    '<=': (-1, False),
+}
+
+class transition() :
+    """
+    Moves the rep state machine from phase src to phase dst when every
+    condition in when holds. events is any of 'attempt' (an attempt starts
+    and its timer runs), 'rep' (a valid repetition is counted) and 'invalid'
+    (an attempt ended without counting).
+    """
+
+    def __init__(self, src, dst, when, events=(), feedback=None):
+        self.src = src
+        self.dst = dst
+        self.when = when
+        self.events = tuple(events)
+        self.feedback = feedback
+
+
+class formCheck() :
+    """
+    Shows (and optionally speaks) feedback when the conditions in when hold
+    but those in require do not, e.g. the hips sag while the arms are bent.
+    phases limits the check to those phases; by default it always applies.
+    """
+
+    def __init__(self, require, feedback, when=(), phases=None, speak=False):
+        self.require = require
+        self.feedback = feedback
+        self.when = when
+        self.phases = phases
+        self.speak = speak
+
+
+class exerciseSpec() :
+    """
+    Everything that makes one exercise different from another.
+
+    angles maps names to landmark triplets. Conditions are written as
+    (angle name, operator, degrees) with operator one of >, >=, < and <=.
+    ready lists the conditions of the starting position; nothing is counted
+    until they have held once. progress is (angle name, low, high) for the
+    HUD progress bar, symmetry a pair of angle names to compare left and
+    right, and encouragement / invalid the spoken message pools.
+    """
+
+    def __init__(self, name, title, angles, start, transitions, ready=(),
+                 formChecks=(), progress=None, symmetry=None,
+                 encouragement=(), invalid=()):
+        self.name = name
+        self.title = title
+        self.angles = angles
+        self.start = start
+        self.transitions = transitions
+        self.ready = ready
+        self.formChecks = formChecks
+        self.progress = progress
+        self.symmetry = symmetry
+        self.encouragement = encouragement
+        self.invalid = invalid
+
+
+class _conditions() :
+    # A list of conditions compiled into index/threshold arrays, so checking
+    # all of them is a single vectorized comparison
+    def __init__(self, conditions, names):
+        self.idx = np.array([names[name] for name, _, _ in conditions], dtype=np.intp)
+        self.sign = np.array([_OPS[op][0] for _, op, _ in conditions], dtype=np.float32)
+        self.strict = np.array([_OPS[op][1] for _, op, _ in conditions], dtype=bool)
+        self.threshold = np.array([value for _, _, value in conditions], dtype=np.float32)
+
+    def holds(self, angles):
+        if not len(self.idx):
+            return True
+        d = self.sign * (angles[self.idx] - self.threshold)
+        return bool(np.all(np.where(self.strict, d > 0, d >= 0)))
+
+
+class exerciseEngine() :
+    """
+    Runs the state machine compiled from an exerciseSpec.
+
+    Pass triplets to poseDetector.findAngles and the result to update() once
+    per frame. update() returns the events of that frame as (kind, value)
+    pairs: ('attempt', attempts), ('rep', count), ('invalid', attempts) and
+    ('speak', text) for spoken form feedback.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        names = {name: i for i, name in enumerate(spec.angles)}
+        self.names = names
+        self.triplets = np.array(list(spec.angles.values()), dtype=np.intp)
+
+        self._ready = _conditions(spec.ready, names)
+        self._transitions = {}
+        for t in spec.transitions:
+            self._transitions.setdefault(t.src, []).append((t, _conditions(t.when, names)))
+        self._checks = [(c, _conditions(c.when, names), _conditions(c.require, names))
+                        for c in spec.formChecks]
+        if spec.progress:
+            self._progressIdx = names[spec.progress[0]]
+        if spec.symmetry:
+            self._symmetryIdx = (names[spec.symmetry[0]], names[spec.symmetry[1]])
+        self.reset()
+
+    def reset(self):
+        self.phase = self.spec.start
+        self.form = False
+        self.count = 0
+        self.attempts = 0
+        self.successRate = 0.0
+        self.feedback = "Start Workout"
+        self.progress = 0.0
+        self.symmetry = 0.0
+        self.repTimes = []
+        self.angles = None
+        self._attemptStart = None
+
+    def angle(self, name):
+        return float(self.angles[self.names[name]])
+
+    def avgRepTime(self):
+        return sum(self.repTimes) / len(self.repTimes) if self.repTimes else 0.0
+
+    def update(self, angles, now=None):
+        now = time.time() if now is None else now
+        self.angles = angles
+        events = []
+
+        if self.spec.progress:
+            _, low, high = self.spec.progress
+            self.progress = float(np.interp(angles[self._progressIdx], (low, high), (0, 100)))
+        if self.spec.symmetry:
+            a, b = self._symmetryIdx
+            self.symmetry = abs(float(angles[a]) - float(angles[b]))
+
+        if not self.form:
+            self.form = self._ready.holds(angles)
+            if not self.form:
+                return events
+
+        # Follow transitions until none applies, so a fast movement can pass
+        # through several phases within one frame
+        moved = False
+        for _ in range(len(self.spec.transitions)):
+            for t, cond in self._transitions.get(self.phase, ()):
+                if cond.holds(angles):
+                    self._fire(t, now, events)
+                    moved = True
+                    break
+            else:
+                break
+
+        if not moved:
+            for check, when, require in self._checks:
+                if check.phases is not None and self.phase not in check.phases:
+                    continue
+                if when.holds(angles) and not require.holds(angles):
+                    self.feedback = check.feedback
+                    if check.speak:
+                        events.append(('speak', check.feedback))
+                    break
+
+        if self.attempts:
+            self.successRate = self.count / self.attempts * 100
+        return events
+
+    def _fire(self, t, now, events):
+        self.phase = t.dst
+        if t.feedback:
+            self.feedback = t.feedback
+        for event in t.events:
+            if event == 'attempt':
+                self.attempts += 1
+                self._attemptStart = now
+                events.append(('attempt', self.attempts))
+            elif event == 'rep':
+                self.count += 1
+                if self._attemptStart is not None:
+                    self.repTimes.append(now - self._attemptStart)
+                    self._attemptStart = None
+                events.append(('rep', self.count))
+            elif event == 'invalid':
+                self._attemptStart = None
+                events.append(('invalid', self.attempts))
+
+    def summary(self):
+        return {
+            "exercise": self.spec.name,
+            "count": self.count,
+            "attempts": self.attempts,
+            "success_rate": self.successRate,
+            "avg_rep_time": self.avgRepTime(),
+        }
@@ -0,0 +1,25 @@
+"""
+Preallocated image buffers that per-frame OpenCV calls write into through
+their dst= parameter, instead of allocating a new full frame every time.
+"""
+
+import numpy as np
+
+class framePool() :
+    """
+    Named buffers reused across frames. get() hands back the same array for
+    a name as long as the requested shape and dtype stay the same, and only
+    allocates when they change (e.g. a new camera resolution or ROI size).
+
+    A pool is not thread-safe; give each thread or component its own.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.uint8):
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buf
+        return buf
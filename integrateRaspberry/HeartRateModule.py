@@ -0,0 +1,338 @@
+"""
+Heart rate samples of a workout. Readings arrive over HTTP or UDP from a
+sensor bridge and are kept in a preallocated NumPy ring buffer per
+session, so sub-second sample rates never grow memory: once the buffer is
+full the oldest samples are overwritten.
+
+A sample message is a JSON object with either one reading,
+    {"bpm": 82, "timestamp": 1718000000.25}
+or several,
+    {"samples": [{"bpm": 82, "timestamp": 1718000000.25}, ...]}
+The timestamp (seconds since the epoch) is optional and defaults to the
+time of arrival. Over UDP, "session_id" selects the session.
+
+heartRateAggregator condenses the samples into fixed windows
+(min/max/mean/last) and time in each heart rate zone while the workout
+runs, so only a compact series has to be stored, whatever the sensor rate.
+"""
+
+import json
+import socket
+import threading
+import time
+import numpy as np
+
+MIN_BPM = 20
+MAX_BPM = 250
+# Zone boundaries in bpm: 60/70/80/90% of a maximum heart rate of 190
+DEFAULT_ZONES = (114, 133, 152, 171)
+
+def parseSamples(message, now=None):
+    """Returns the (timestamps, bpm) arrays of a sample message, or raises ValueError."""
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+    samples = message["samples"] if "samples" in message else [message]
+    if not isinstance(samples, list) or not samples:
+        raise ValueError("No samples")
+    now = time.time() if now is None else now
+    try:
+        bpm = np.array([sample["bpm"] for sample in samples], dtype=np.float32)
+        times = np.array([sample.get("timestamp", now) for sample in samples], dtype=np.float64)
+    except (KeyError, TypeError, AttributeError, ValueError):
+        raise ValueError("Every sample needs a numeric bpm (and optionally a timestamp)")
+    if not np.all((bpm >= MIN_BPM) & (bpm <= MAX_BPM)):
+        raise ValueError(f"bpm must be between {MIN_BPM} and {MAX_BPM}")
+    return times, bpm
+
+
+class heartRateBuffer() :
+    """
+    Fixed-size ring buffer of (timestamp, bpm) samples. Writes and reads
+    may come from different threads.
+    """
+
+    def __init__(self, capacity=72000):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype=np.float64)
+        self.bpm = np.zeros(capacity, dtype=np.float32)
+        self.total = 0  # samples written so far, including overwritten ones
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    @property
+    def overwritten(self):
+        return max(self.total - self.capacity, 0)
+
+    def extend(self, times, bpm):
+        """Appends a batch of samples in one vectorized write."""
+        times = np.asarray(times, dtype=np.float64)
+        bpm = np.asarray(bpm, dtype=np.float32)
+        with self._lock:
+            if len(bpm) > self.capacity:
+                # Only the newest capacity samples would survive anyway
+                self.total += len(bpm) - self.capacity
+                times, bpm = times[-self.capacity:], bpm[-self.capacity:]
+            index = (self.total + np.arange(len(bpm))) % self.capacity
+            self.times[index] = times
+            self.bpm[index] = bpm
+            self.total += len(bpm)
+
+    def read(self, start=0):
+        """
+        Copies of the samples written from write index start on (see total),
+        in the order they were written, and the index to read from next.
+        Samples overwritten in the meantime are skipped.
+        """
+        with self._lock:
+            total = self.total
+            index = np.arange(max(start, total - self.capacity, 0), total) % self.capacity
+            return self.times[index], self.bpm[index], total
+
+
+class udpListener() :
+    """
+    Receives sample messages as UDP datagrams (one JSON object each) and
+    hands them to onMessage(message) on a background thread. onMessage may
+    raise ValueError or LookupError to reject a message.
+    """
+
+    def __init__(self, port, onMessage, host='0.0.0.0'):
+        self.port = port
+        self.host = host
+        self.onMessage = onMessage
+        self.received = 0
+        self.rejected = 0
+        self._sock = None
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        if self._thread is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.bind((self.host, self.port))
+            self._sock.settimeout(0.5)
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print(f"Listening for heart rate samples on udp://{self.host}:{self.port}")
+        return self
+
+    def stop(self, timeout=1):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _run(self):
+        while self._running:
+            try:
+                data, sender = self._sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            try:
+                self.onMessage(json.loads(data))
+                self.received += 1
+            except (ValueError, LookupError) as e:
+                # Log the first rejects of a sender, then every 100th
+                self.rejected += 1
+                if self.rejected <= 10 or self.rejected % 100 == 0:
+                    print(f"Rejected heart rate datagram from {sender[0]} ({self.rejected} so far): {e}")
+
+
+class heartRateSampler() :
+    """
+    Takes a reading from source() every interval seconds on a background
+    thread and hands it to onSample(bpm), starting with one right away.
+    The wait between readings is interruptible, so stop() returns within
+    milliseconds. Sampling also ends when onSample raises LookupError
+    (e.g. the session is no longer running).
+    """
+
+    def __init__(self, source, onSample, interval=10):
+        self.source = source
+        self.onSample = onSample
+        self.interval = interval
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=1):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def isAlive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.onSample(self.source())
+                self.samples += 1
+            except LookupError:
+                break
+            except Exception as e:
+                print(f"Heart rate sample failed: {e}")
+            # Returns as soon as stop() is called
+            self._stop.wait(self.interval)
+
+
+def aggregateWindows(times, bpm, window, origin=0):
+    """
+    Per-window min/max/mean/last/count of time-ordered samples, where the
+    windows are window seconds long and aligned to origin. Returns a dict
+    of arrays, one entry per window that has samples.
+    """
+    if len(times) == 0:
+        return {key: np.zeros(0) for key in ("start", "min", "max", "mean", "last", "count")}
+    index = np.floor((times - origin) / window).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(index)) + 1))
+    ends = np.concatenate((starts[1:], [len(times)]))
+    counts = ends - starts
+    return {
+        "start": origin + index[starts] * window,
+        "min": np.minimum.reduceat(bpm, starts),
+        "max": np.maximum.reduceat(bpm, starts),
+        "mean": np.add.reduceat(bpm.astype(np.float64), starts) / counts,
+        "last": bpm[ends - 1],
+        "count": counts,
+    }
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling: the indices of threshold
+    points that keep the visual shape of the series (always including the
+    first and the last point).
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.floor(np.linspace(1, n - 1, threshold - 1)).astype(np.int64)
+    selected = np.zeros(threshold, dtype=np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # The next bucket's average is the third corner of the triangle
+        nextEnd = edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = x[end:nextEnd].mean(), y[end:nextEnd].mean()
+        areas = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+
+class heartRateAggregator() :
+    """
+    Streams a session's heartRateBuffer into fixed windows. update() folds
+    in the samples that arrived since the last call and keeps only the
+    per-window statistics and the time spent in each heart rate zone, so
+    the raw buffer only has to hold the samples of the open window.
+
+    Every sample written to the buffer is read exactly once (by its write
+    index, so samples sharing a timestamp all count). Samples that arrive
+    with a timestamp older than the newest one already aggregated are
+    skipped, and gaps longer than maxGap seconds do not count towards any
+    zone.
+    """
+
+    def __init__(self, window=10, zones=DEFAULT_ZONES, maxGap=15):
+        self.window = window
+        self.zones = np.asarray(zones, dtype=np.float32)
+        self.maxGap = maxGap
+        self.origin = None
+        self.samples = 0
+        self.zoneSeconds = np.zeros(len(zones) + 1)
+        self._windows = []  # aggregateWindows() results of closed windows
+        self._open = (np.zeros(0), np.zeros(0, dtype=np.float32))  # samples of the open window
+        self._last = None  # newest aggregated (timestamp, bpm)
+        self._read = 0  # write index of the next buffer sample to aggregate
+        self.updated = 0
+        self._lock = threading.Lock()
+
+    def update(self, buffer, final=False):
+        """Aggregates new samples of buffer; with final=True the open window is closed as well."""
+        with self._lock:
+            self.updated = time.time()
+            times, bpm, self._read = buffer.read(self._read)
+            # Samples from several senders can arrive slightly out of order
+            if len(times) > 1 and np.any(np.diff(times) < 0):
+                order = np.argsort(times, kind='stable')
+                times, bpm = times[order], bpm[order]
+            if self._last and len(times) and times[0] < self._last[0]:
+                keep = times >= self._last[0]
+                times, bpm = times[keep], bpm[keep]
+            if len(times) == 0 and not final:
+                return
+            if self.origin is None and len(times):
+                self.origin = float(times[0])
+
+            # Time in zone, from each sample to the next
+            if len(times):
+                prevTimes = np.concatenate(([self._last[0]], times)) if self._last else times
+                prevBpm = np.concatenate(([self._last[1]], bpm)) if self._last else bpm
+                durations = np.clip(np.diff(prevTimes), 0, None)
+                durations[durations > self.maxGap] = 0
+                zone = np.digitize(prevBpm[:-1], self.zones)
+                self.zoneSeconds += np.bincount(zone, weights=durations, minlength=len(self.zoneSeconds))
+                self.samples += len(times)
+                self._last = (float(times[-1]), float(bpm[-1]))
+
+            times = np.concatenate((self._open[0], times))
+            bpm = np.concatenate((self._open[1], bpm))
+            if len(times) == 0:
+                return
+            # Everything before the newest sample's window is complete
+            closed = len(times) if final else int(np.searchsorted(
+                times, self.origin + np.floor((times[-1] - self.origin) / self.window) * self.window))
+            if closed:
+                self._windows.append(aggregateWindows(times[:closed], bpm[:closed], self.window, self.origin))
+            self._open = (times[closed:], bpm[closed:])
+
+    def windows(self):
+        """The closed windows so far, as one dict of arrays."""
+        with self._lock:
+            if not self._windows:
+                return aggregateWindows(np.zeros(0), np.zeros(0), self.window)
+            return {key: np.concatenate([w[key] for w in self._windows]) for key in self._windows[0]}
+
+    def series(self, maxPoints=None):
+        """The closed windows, downsampled with LTTB on their mean to at most maxPoints."""
+        windows = self.windows()
+        if maxPoints and len(windows["start"]) > maxPoints:
+            keep = lttb(windows["start"], windows["mean"], maxPoints)
+            windows = {key: values[keep] for key, values in windows.items()}
+        return windows
+
+    def summary(self):
+        """Statistics of all aggregated samples, including those of the open window."""
+        windows = self.windows()
+        counts = windows["count"]
+        openBpm = self._open[1]
+        total = counts.sum() + len(openBpm)
+        lows = np.concatenate((windows["min"], openBpm))
+        highs = np.concatenate((windows["max"], openBpm))
+        return {
+            "samples": self.samples,
+            "windows": len(counts),
+            "min": float(lows.min()) if total else None,
+            "max": float(highs.max()) if total else None,
+            "mean": float(((windows["mean"] * counts).sum() + openBpm.sum()) / total) if total else None,
+            "last": self._last[1] if self._last else None,
+            "time_in_zone": {f"zone{i + 1}": round(float(seconds), 1) for i, seconds in enumerate(self.zoneSeconds)},
+        }
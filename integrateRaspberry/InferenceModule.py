@@ -0,0 +1,153 @@
+"""
+Shared pool of threads that runs pose inference for several camera
+streams, so one box can drive a station per camera without every station
+starting its own inference thread and all of them fighting over the cores.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+def availableCores():
+    """Cores this process may run on (its affinity mask, where the OS has one)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+class inferenceJob() :
+    def __init__(self, stream, func, args):
+        self.stream = stream
+        self.func = func
+        self.args = args
+        self.queued = time.perf_counter()
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class inferencePool() :
+    """
+    size worker threads (one per available core by default) that run
+    inference jobs of any number of streams in the order they were queued.
+
+    run(stream, func, *args) queues func(*args) and waits for its result.
+    Each stream has a single pipeline stage calling run(), so a stream never
+    has more than one job queued: its detector is never used by two workers
+    at once, its frames stay in order, and with more streams than workers
+    they take turns round-robin. The newest frame is picked by the stream's
+    own pipeline queue, so a stream that falls behind drops frames instead
+    of delaying the others.
+
+    Per-stream fps, inference latency and queue wait are measured over the
+    last window seconds; see metrics().
+    """
+
+    def __init__(self, size=None, window=5):
+        self.size = size or availableCores()
+        self.window = window
+        self.busy = 0
+        self._jobs = deque()
+        self._stats = {}  # stream -> deque of (done, wait, latency)
+        self._cond = threading.Condition()
+        self._running = True
+        self._threads = [threading.Thread(target=self._run, name=f"inference-{i}", daemon=True)
+                         for i in range(self.size)]
+        for thread in self._threads:
+            thread.start()
+
+    def run(self, stream, func, *args):
+        """Runs func(*args) on a worker and returns (or raises) its result."""
+        job = inferenceJob(stream, func, args)
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Inference pool is closed")
+            self._jobs.append(job)
+            self._cond.notify()
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._jobs or not self._running)
+                if not self._jobs:
+                    return
+                job = self._jobs.popleft()
+                self.busy += 1
+
+            start = time.perf_counter()
+            try:
+                job.result = job.func(*job.args)
+            except Exception as e:
+                job.error = e
+            done = time.perf_counter()
+
+            with self._cond:
+                self.busy -= 1
+                self._stats.setdefault(job.stream, deque(maxlen=1000)).append(
+                    (done, start - job.queued, done - start))
+            job.done.set()
+
+    def forget(self, stream):
+        """Drops the measurements of a stream that stopped."""
+        with self._cond:
+            self._stats.pop(stream, None)
+
+    def streamMetrics(self, stream):
+        with self._cond:
+            samples = list(self._stats.get(stream, ()))
+        return self._summarize(samples, time.perf_counter())
+
+    def _summarize(self, samples, now):
+        recent = [s for s in samples if now - s[0] <= self.window]
+        if not recent:
+            return {"fps": 0.0, "latency_ms": None, "wait_ms": None, "frames": len(samples), "busy": 0.0}
+        # A stream that started less than a window ago is measured since its first frame
+        span = max(min(self.window, now - samples[0][0]), 1e-3)
+        return {
+            "fps": len(recent) / span,
+            "latency_ms": sum(s[2] for s in recent) / len(recent) * 1000,
+            "wait_ms": sum(s[1] for s in recent) / len(recent) * 1000,
+            "frames": len(samples),
+            "busy": sum(s[2] for s in recent) / span,  # worker-seconds per second
+        }
+
+    def metrics(self):
+        """
+        Pool throughput (inferences per second over all streams), how much of
+        the workers' time inference took, and fps, latency and queue wait
+        per stream.
+        """
+        now = time.perf_counter()
+        with self._cond:
+            samples = {stream: list(stats) for stream, stats in self._stats.items()}
+            queued = len(self._jobs)
+            busy = self.busy
+        streams = {stream: self._summarize(s, now) for stream, s in samples.items()}
+        return {
+            "workers": self.size,
+            "busy_workers": busy,
+            "queued": queued,
+            "throughput_fps": sum(m["fps"] for m in streams.values()),
+            "utilization": min(sum(m["busy"] for m in streams.values()) / self.size, 1.0),
+            "streams": streams,
+        }
+
+    def summary(self):
+        m = self.metrics()
+        streams = ", ".join(f"{stream}: {s['fps']:.1f} fps" for stream, s in m["streams"].items())
+        return (f"{m['throughput_fps']:.1f} inferences/s on {m['workers']} workers "
+                f"({m['utilization']:.0%} busy){'; ' + streams if streams else ''}")
+
+    def close(self):
+        """Stops the workers once the queued jobs are done."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2)
@@ -0,0 +1,76 @@
+"""
+Message channel between the server and a workout process: JSON objects
+framed with a 4-byte big-endian length over a Unix socket pair.
+"""
+
+import json
+import socket
+import struct
+import threading
+
+HEADER = struct.Struct('>I')
+MAX_MESSAGE = 1 << 20  # refuse anything larger than 1 MB
+
+class messageChannel() :
+    """
+    Sends and receives whole messages (dicts) over a connected socket.
+    send() may be called from any thread; recv() blocks until a message
+    arrives and returns None once the other side has closed the channel.
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._sendLock = threading.Lock()
+
+    @classmethod
+    def fromFd(cls, fd):
+        """Wraps a socket inherited from the parent process (see pass_fds)."""
+        return cls(socket.socket(fileno=fd))
+
+    def send(self, message):
+        """Returns False if the other side is gone."""
+        # default=float also covers NumPy scalars such as angles or rates
+        data = json.dumps(message, default=float).encode()
+        try:
+            with self._sendLock:
+                self.sock.sendall(HEADER.pack(len(data)) + data)
+            return True
+        except OSError:
+            return False
+
+    def recv(self):
+        header = self._recvExactly(HEADER.size)
+        if header is None:
+            return None
+        (length,) = HEADER.unpack(header)
+        if length > MAX_MESSAGE:
+            raise ValueError(f"Message of {length} bytes is too large")
+        body = self._recvExactly(length)
+        if body is None:
+            return None
+        return json.loads(body)
+
+    def _recvExactly(self, n):
+        buf = bytearray()
+        while len(buf) < n:
+            try:
+                chunk = self.sock.recv(n - len(buf))
+            except OSError:
+                return None
+            if not chunk:
+                return None
+            buf += chunk
+        return bytes(buf)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def channelPair():
+    """Returns (channel for this process, socket to pass to the child)."""
+    parent, child = socket.socketpair()
+    return messageChannel(parent), child
@@ -0,0 +1,200 @@
+"""
+Write-behind outbox for database writes. Records are committed to a local
+SQLite file first, and a background thread pushes them to the database
+whenever it is reachable, so a request never waits on the network and a
+workout is not lost when the uplink is down.
+
+Every record has an idempotency key: adding the same key twice is a
+no-op, and the key is handed to the handler so the remote write can be
+made idempotent as well. A record can have children (e.g. the heart rate
+readings of a workout) that are only sent once their parent was, and that
+get the parent's result (e.g. its workout_id).
+"""
+
+import json
+import random
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL UNIQUE,
+    parent TEXT,
+    payload TEXT NOT NULL,
+    result TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    sent REAL
+)
+"""
+
+class outbox() :
+    """
+    SQLite-backed queue of records waiting to be written remotely.
+
+    Register a handler per record kind with addHandler(kind, handler,
+    batchSize). The sync thread calls handler(records, parentResult) with up
+    to batchSize ready records of that kind and the same parent, where each
+    record is a (key, payload) tuple. The handler returns one result per
+    record (or None) and raises if the write failed, in which case the batch
+    is retried with exponential backoff and jitter.
+    """
+
+    def __init__(self, path='outbox.db', retryInitial=5, retryMax=300, keepSent=24 * 3600):
+        self.path = path
+        self.retryInitial = retryInitial
+        self.retryMax = retryMax
+        self.keepSent = keepSent
+        self.handlers = {}  # kind -> (handler, batchSize)
+        self.sent = 0
+        self.failed = 0
+        self.lastError = None
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._running = False
+        self._thread = None
+
+    def addHandler(self, kind, handler, batchSize=1):
+        self.handlers[kind] = (handler, max(batchSize, 1))
+        return self
+
+    def add(self, kind, key, payload, children=()):
+        """
+        Commits a record and its children, given as (kind, payload) tuples,
+        in one transaction. Returns False if key was already added.
+        """
+        rows = [(kind, key, None, json.dumps(payload))]
+        rows += [(childKind, f"{key}/{i}", key, json.dumps(childPayload))
+                 for i, (childKind, childPayload) in enumerate(children)]
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.executemany("INSERT INTO outbox (kind, key, parent, payload) VALUES (?, ?, ?, ?)", rows)
+            except sqlite3.IntegrityError:
+                return False
+        self._wake.set()
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        with self._lock:
+            self._db.close()
+
+    def pending(self):
+        """Unsent records per kind, plus the sync counters."""
+        with self._lock:
+            rows = self._db.execute("SELECT kind, COUNT(*) FROM outbox WHERE sent IS NULL GROUP BY kind").fetchall()
+        return {"pending": dict(rows), "sent": self.sent, "failed": self.failed, "last_error": self.lastError}
+
+    def status(self, key):
+        """Sync state of one record: None if unknown, else whether it was sent and its result."""
+        with self._lock:
+            row = self._db.execute("SELECT sent, result, attempts, error FROM outbox WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        sent, result, attempts, error = row
+        return {"sent": sent is not None, "result": json.loads(result) if result else None,
+                "attempts": attempts, "error": error}
+
+    def _ready(self):
+        """SQL condition for records that can be sent: handled, and their parent (if any) already sent."""
+        kinds = list(self.handlers)
+        return (f"o.sent IS NULL AND o.kind IN ({','.join('?' * len(kinds))}) "
+                "AND (o.parent IS NULL OR EXISTS (SELECT 1 FROM outbox p WHERE p.key = o.parent AND p.sent IS NOT NULL))",
+                kinds)
+
+    def _nextBatch(self):
+        """Returns (kind, parentResult, rows) of the oldest due batch, or None."""
+        ready, kinds = self._ready()
+        with self._lock:
+            row = self._db.execute(f"SELECT o.kind, o.parent FROM outbox o WHERE {ready} AND o.next_attempt <= ? "
+                                   "ORDER BY o.id LIMIT 1", (*kinds, time.time())).fetchone()
+            if row is None:
+                return None
+            kind, parent = row
+            rows = self._db.execute("""
+                SELECT id, key, payload FROM outbox
+                WHERE sent IS NULL AND next_attempt <= ? AND kind = ? AND parent IS ?
+                ORDER BY id LIMIT ?""", (time.time(), kind, parent, self.handlers[kind][1])).fetchall()
+            parentResult = None
+            if parent is not None:
+                parentResult = self._db.execute("SELECT result FROM outbox WHERE key = ?", (parent,)).fetchone()[0]
+        return kind, json.loads(parentResult) if parentResult else None, rows
+
+    def _nextDue(self):
+        """Seconds until the next record waiting for a retry is due, or None if there is none."""
+        ready, kinds = self._ready()
+        with self._lock:
+            due = self._db.execute(f"SELECT MIN(o.next_attempt) FROM outbox o WHERE {ready}", kinds).fetchone()[0]
+        return max(due - time.time(), 0.1) if due is not None else None
+
+    def _send(self, kind, parentResult, rows):
+        handler, _ = self.handlers[kind]
+        ids = [row[0] for row in rows]
+        try:
+            results = handler([(key, json.loads(payload)) for _, key, payload in rows], parentResult)
+        except Exception as e:
+            self.failed += 1
+            self.lastError = str(e)
+            with self._lock, self._db:
+                attempts = self._db.execute("SELECT MAX(attempts) FROM outbox WHERE id IN (%s)"
+                                            % ','.join('?' * len(ids)), ids).fetchone()[0] + 1
+                delay = min(self.retryInitial * 2 ** (attempts - 1), self.retryMax) * random.uniform(0.8, 1.2)
+                self._db.execute("UPDATE outbox SET attempts = ?, next_attempt = ?, error = ? WHERE id IN (%s)"
+                                 % ','.join('?' * len(ids)), (attempts, time.time() + delay, str(e), *ids))
+            print(f"Outbox: {len(rows)} {kind} record(s) failed (attempt {attempts}), retrying in {delay:.0f}s: {e}")
+            return
+
+        results = results if results is not None else [None] * len(rows)
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany("UPDATE outbox SET sent = ?, result = ?, error = NULL WHERE id = ?",
+                                 [(now, json.dumps(result) if result is not None else None, rowId)
+                                  for rowId, result in zip(ids, results)])
+        self.sent += len(rows)
+        print(f"Outbox: synced {len(rows)} {kind} record(s)")
+
+    def _cleanup(self):
+        """Drops sent records once they are old and none of their children are still pending."""
+        with self._lock, self._db:
+            self._db.execute("""
+                DELETE FROM outbox WHERE sent IS NOT NULL AND sent < ?
+                  AND key NOT IN (SELECT parent FROM outbox WHERE parent IS NOT NULL AND sent IS NULL)""",
+                             (time.time() - self.keepSent,))
+
+    def _run(self):
+        lastCleanup = 0
+        while self._running:
+            batch = self._nextBatch()
+            if batch is None:
+                # Nothing due: sleep until the next retry or until a record is added
+                due = self._nextDue()
+                self._wake.wait(min(due, 60) if due is not None else 60)
+                self._wake.clear()
+                continue
+            self._send(*batch)
+            if time.time() - lastCleanup > 600:
+                self._cleanup()
+                lastCleanup = time.time()
@@ -0,0 +1,185 @@
+"""
+Runs the per-frame work as a chain of worker threads connected by bounded
+queues, so the frame rate is set by the slowest stage instead of the sum of
+every stage's latency.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+# What a stage does when the queue it feeds is full
+BLOCK = 'block'              # wait for the next stage to catch up
+DROP_OLDEST = 'drop_oldest'  # replace the oldest waiting frame
+DROP_NEWEST = 'drop_newest'  # discard the frame just produced
+
+# Returned by a stage function to end the pipeline, e.g. when the camera
+# stops delivering frames or the stream output fails
+STOP = object()
+
+class frameQueue() :
+    """
+    Bounded FIFO between two stages with a configurable drop policy.
+    get() returns None once the queue has been closed and drained.
+    """
+
+    def __init__(self, maxsize=2, policy=DROP_OLDEST):
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self._items = deque()
+        self._cond = threading.Condition()
+
+    def put(self, item):
+        with self._cond:
+            if self.policy == BLOCK:
+                while len(self._items) >= self.maxsize and not self.closed:
+                    self._cond.wait()
+            elif len(self._items) >= self.maxsize:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._items.popleft()
+            if self.closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self.closed, timeout):
+                raise queue.Empty
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def depth(self):
+        return len(self._items)
+
+
+class pipelineStage() :
+    """
+    Worker thread that takes items from inQueue (or produces them itself when
+    it has none), runs func on each and passes the result to outQueue.
+    func may return None to skip an item or STOP to end the pipeline.
+    """
+
+    def __init__(self, name, func, inQueue=None, outQueue=None, window=30):
+        self.name = name
+        self.func = func
+        self.inQueue = inQueue
+        self.outQueue = outQueue
+        self.processed = 0
+        self.error = None
+        self._latencies = deque(maxlen=window)
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def isAlive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def latency(self):
+        """Average seconds spent in func over the recent window."""
+        if not self._latencies:
+            return 0.0
+        return sum(self._latencies) / len(self._latencies)
+
+    def _run(self):
+        try:
+            while self._running:
+                item = None
+                if self.inQueue is not None:
+                    try:
+                        item = self.inQueue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if item is None:
+                        break
+
+                start = time.perf_counter()
+                result = self.func(item)
+                self._latencies.append(time.perf_counter() - start)
+                self.processed += 1
+
+                if result is STOP:
+                    break
+                if result is not None and self.outQueue is not None:
+                    self.outQueue.put(result)
+        except Exception as e:
+            print(f"Pipeline stage '{self.name}' failed: {e}")
+            self.error = e
+        finally:
+            # Closing our output lets every later stage drain and finish
+            if self.outQueue is not None:
+                self.outQueue.close()
+
+
+class framePipeline() :
+    """
+    Chain of pipelineStages. The first stage is the source, and the output
+    queue of the last stage is left for the caller (e.g. the display loop,
+    which has to run on the main thread for cv2.imshow).
+    """
+
+    def __init__(self):
+        self.stages = []
+        self.output = None
+
+    def addStage(self, name, func, maxsize=2, policy=DROP_OLDEST):
+        outQueue = frameQueue(maxsize, policy)
+        stage = pipelineStage(name, func, self.output, outQueue)
+        self.stages.append(stage)
+        self.output = outQueue
+        return stage
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def stop(self):
+        for stage in self.stages:
+            stage._running = False
+            stage.outQueue.close()
+        for stage in self.stages:
+            stage.stop()
+
+    def metrics(self):
+        """Per-stage latency, throughput and output queue state."""
+        return {
+            stage.name: {
+                "latency_ms": stage.latency() * 1000,
+                "processed": stage.processed,
+                "queue_depth": stage.outQueue.depth(),
+                "queue_size": stage.outQueue.maxsize,
+                "dropped": stage.outQueue.dropped,
+            }
+            for stage in self.stages
+        }
+
+    def summary(self):
+        return " | ".join(
+            f"{name}: {m['latency_ms']:.1f} ms, queue {m['queue_depth']}/{m['queue_size']}, "
+            f"dropped {m['dropped']}"
+            for name, m in self.metrics().items()
+        )
@@ -2,15 +2,121 @@
 Detects and draws landmarks on the body of a person in the frame.
 """
 
+import os
 import cv2
 import mediapipe as mp
 import math
+import time
+from collections import deque
+import numpy as np
+from FrameModule import framePool
+
+NUM_LANDMARKS = 33
+
+# Landmark model of each MediaPipe Pose complexity. Only the full model
+# ships with the package; MediaPipe downloads the others from GitHub the
+# first time a graph of that complexity is built.
+POSE_MODELS = {0: 'pose_landmark_lite.tflite', 1: 'pose_landmark_full.tflite', 2: 'pose_landmark_heavy.tflite'}
+
+
+def installedComplexities():
+    """Model complexities whose landmark model is already on disk."""
+    root = os.path.join(os.path.dirname(mp.__file__), 'modules', 'pose_landmark')
+    return [complexity for complexity, name in POSE_MODELS.items()
+            if os.path.exists(os.path.join(root, name))]
+
+# Elbows, shoulders, hips and knees; their angular velocity drives the
+# adaptive inference rate
+MOTION_TRIPLETS = np.array([
+    [11, 13, 15], [12, 14, 16],
+    [13, 11, 23], [14, 12, 24],
+    [11, 23, 25], [12, 24, 26],
+    [23, 25, 27], [24, 26, 28],
+])
+
+
+def jointAngles(pts, triplets):
+    """
+    Returns the angle at p2 for every [p1, p2, p3] row of triplets, given an
+    array of (x, y) points, folded into [0, 180] like poseDetector.findAngle.
+    """
+    a = pts[triplets[:, 0]]
+    b = pts[triplets[:, 1]]
+    c = pts[triplets[:, 2]]
+
+    angles = np.degrees(np.arctan2(c[:, 1] - b[:, 1], c[:, 0] - b[:, 0]) -
+                        np.arctan2(a[:, 1] - b[:, 1], a[:, 0] - b[:, 0]))
+    # Wrap into [0, 360) and fold reflex angles back into [0, 180]
+    np.mod(angles, 360, out=angles)
+    np.subtract(360, angles, out=angles, where=angles > 180)
+    return angles
+
+
+class complexityGovernor() :
+    """
+    Watches per-frame inference latency over a sliding window and picks the
+    MediaPipe model complexity (0, 1 or 2) that keeps it within the frame
+    budget of targetFps.
+
+    It steps down once the window average exceeds upper * budget and steps up
+    once it falls below lower * budget and at least holdSeconds have passed
+    since the last swap. The window is cleared after every swap, so each
+    decision is based on a full window of the new model. A step down that
+    undoes the previous step up doubles the hold time (up to 8x), so a model
+    that is only just too slow is retried less and less often.
+    """
+
+    def __init__(self, targetFps=15, minComplexity=0, maxComplexity=2,
+                 window=30, upper=0.9, lower=0.4, holdSeconds=10):
+        self.targetFps = targetFps
+        self.budget = 1.0 / targetFps
+        self.minComplexity = minComplexity
+        self.maxComplexity = maxComplexity
+        self.upper = upper
+        self.lower = lower
+        self.holdSeconds = holdSeconds
+        self.samples = deque(maxlen=window)
+        self.events = deque(maxlen=50)  # (time, old, new, average latency)
+        self._hold = holdSeconds
+        self._lastSwap = time.time()
+
+    def averageLatency(self):
+        if not self.samples:
+            return 0.0
+        return sum(self.samples) / len(self.samples)
+
+    def update(self, latency, complexity):
+        """Records one inference latency and returns the complexity to use next."""
+        self.samples.append(latency)
+        if len(self.samples) < self.samples.maxlen:
+            return complexity
+
+        avg = self.averageLatency()
+        new = complexity
+        if avg > self.upper * self.budget and complexity > self.minComplexity:
+            new = complexity - 1
+        elif avg < self.lower * self.budget and complexity < self.maxComplexity and \
+                time.time() - self._lastSwap >= self._hold:
+            new = complexity + 1
+
+        if new != complexity:
+            now = time.time()
+            if new < complexity and self.events and self.events[-1][2] > self.events[-1][1]:
+                self._hold = min(self._hold * 2, self.holdSeconds * 8)
+            self.events.append((now, complexity, new, avg))
+            self._lastSwap = now
+            self.samples.clear()
+        return new
+
 
 class poseDetector() :
     
     def __init__(self, mode=False, complexity=1, smooth_landmarks=True,
                  enable_segmentation=False, smooth_segmentation=True,
-                 detectionCon=0.5, trackCon=0.5):
+                 detectionCon=0.5, trackCon=0.5,
+                 roi=False, roiMargin=0.25, roiMaxSize=480, roiMinVisibility=0.5,
+                 adaptive=False, maxSkip=3, slowVelocity=60, fastVelocity=180,
+                 governor=None, downloadModels=False):
         
         self.mode = mode 
         self.complexity = complexity
@@ -19,17 +125,65 @@ class poseDetector() :
         self.smooth_segmentation = smooth_segmentation
         self.detectionCon = detectionCon
         self.trackCon = trackCon
+
+        # Region-of-interest tracking: when enabled, inference runs on a crop
+        # around the previous frame's landmarks, downscaled so its longest
+        # side is at most roiMaxSize pixels. roiBox is (x0, y0, x1, y1) in
+        # full-frame pixels, or None while no person is being tracked.
+        self.roi = roi
+        self.roiMargin = roiMargin
+        self.roiMaxSize = roiMaxSize
+        self.roiMinVisibility = roiMinVisibility
+        self.roiBox = None
+
+        # Adaptive inference rate: when enabled, full inference only runs on
+        # every inferInterval-th frame and the frames in between get
+        # landmarks extrapolated from the last two keyframes. The interval
+        # grows up to maxSkip while the fastest joint moves slower than
+        # slowVelocity (degrees per second) and drops back to 1 as soon as
+        # one moves faster than fastVelocity.
+        self.adaptive = adaptive
+        self.maxSkip = maxSkip
+        self.slowVelocity = slowVelocity
+        self.fastVelocity = fastVelocity
+        self.inferInterval = 1
+        self.isKeyframe = True
+        self.jointVelocity = 0.0
+        self._framesSinceKey = 0
+        self._keyPrev = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._keyLast = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._keyPrevTime = None
+        self._keyLastTime = None
         
+        # Optional complexityGovernor that swaps the model graph when
+        # inference falls behind or has headroom to spare. Unless
+        # downloadModels is set it only picks models that are already on
+        # disk, so a swap never waits on (or fails with) a download.
+        self.governor = governor
+        self.inferenceLatency = 0.0
+        if governor is not None and not downloadModels:
+            self._limitToInstalled(governor)
+
         self.mpDraw = mp.solutions.drawing_utils
         self.mpPose = mp.solutions.pose
-        self.pose = self.mpPose.Pose(self.mode, self.complexity, self.smooth_landmarks,
-                                     self.enable_segmentation, self.smooth_segmentation,
-                                     self.detectionCon, self.trackCon)
-        
+        self.pose = self._createPose()
+
+        # Landmark buffers reused across frames by findPosition(asArray=True).
+        # Columns are x, y, z, visibility; lmNorm holds MediaPipe's normalized
+        # values and lmArray the same landmarks scaled to image pixels.
+        self.lmNorm = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self.lmArray = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._lmScale = np.ones(4, dtype=np.float32)
+        self.lmList = []
+
+        # RGB and ROI resize buffers for the inference input, reused across frames
+        self.pool = framePool()
         
     def findPose (self, img, draw=True):
-        imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.pose.process(imgRGB)
+        if self.adaptive and self._framesSinceKey + 1 < self.inferInterval:
+            self._extrapolate()
+        else:
+            self._infer(img)
         
         if self.results.pose_landmarks:
             if draw:
@@ -37,25 +191,253 @@ class poseDetector() :
                                            self.mpPose.POSE_CONNECTIONS)
                 
         return img
-    
-    def findPosition(self, img, draw=True):
+
+    def _createPose(self, complexity=None):
+        complexity = self.complexity if complexity is None else complexity
+        return self.mpPose.Pose(self.mode, complexity, self.smooth_landmarks,
+                                self.enable_segmentation, self.smooth_segmentation,
+                                self.detectionCon, self.trackCon)
+
+    def _limitToInstalled(self, governor):
+        # The installed models around the starting one; the full model is
+        # always there, so this is a contiguous range
+        installed = set(installedComplexities()) | {self.complexity}
+        low = high = self.complexity
+        while low - 1 in installed and low - 1 >= governor.minComplexity:
+            low -= 1
+        while high + 1 in installed and high + 1 <= governor.maxComplexity:
+            high += 1
+        governor.minComplexity, governor.maxComplexity = low, high
+
+    def setComplexity(self, complexity):
+        """
+        Replaces the MediaPipe Pose graph with one of the given model
+        complexity. The new graph is built before the old one is closed, so
+        if that fails (e.g. its model could not be downloaded) the detector
+        keeps running the old one. Returns whether the swap happened.
+        """
+        if complexity == self.complexity:
+            return True
+        try:
+            pose = self._createPose(complexity)
+        except Exception as e:
+            print(f"Could not load the complexity {complexity} model, keeping {self.complexity}: {e}")
+            return False
+        old = self.pose
+        self.pose = pose
+        self.complexity = complexity
+        old.close()
+        # The new graph has no tracking state, so restart from a full frame
+        self.roiBox = None
+        return True
+
+    def reset(self):
+        """Forgets the tracked person, e.g. before the next workout reuses the model."""
+        self.roiBox = None
+        self.inferInterval = 1
+        self.jointVelocity = 0.0
+        self._framesSinceKey = 0
+        self._keyPrevTime = None
+        self._keyLastTime = None
+
+    def _infer(self, img):
+        start = time.perf_counter()
+        if self.roi:
+            self.results = self._processRoi(img)
+        else:
+            self.results = self.pose.process(self._toRGB(img))
+        self.inferenceLatency = time.perf_counter() - start
+        self.isKeyframe = True
+        self._framesSinceKey = 0
+
+        if self.governor is not None:
+            complexity = self.governor.update(self.inferenceLatency, self.complexity)
+            if complexity != self.complexity:
+                old = self.complexity
+                if self.setComplexity(complexity):
+                    avg = self.governor.events[-1][3]
+                    print(f"Model complexity {old} -> {complexity} "
+                          f"(avg inference {avg * 1000:.1f} ms, "
+                          f"budget {self.governor.budget * 1000:.1f} ms)")
+                elif complexity > old:
+                    # Do not try that model again
+                    self.governor.maxComplexity = old
+                else:
+                    self.governor.minComplexity = old
+
+        if self.adaptive:
+            self._updateKeyframes(img)
+
+    def _updateKeyframes(self, img):
+        now = time.perf_counter()
+        if not self.results.pose_landmarks:
+            # Nothing to extrapolate from, so infer every frame until found
+            self._keyPrevTime = self._keyLastTime = None
+            self.inferInterval = 1
+            return
+
+        self._keyPrev, self._keyLast = self._keyLast, self._keyPrev
+        for id, lm in enumerate(self.results.pose_landmarks.landmark):
+            self._keyLast[id] = (lm.x, lm.y, lm.z, lm.visibility)
+        self._keyPrevTime, self._keyLastTime = self._keyLastTime, now
+        if self._keyPrevTime is None:
+            return
+
+        # Angles are measured in pixels so the aspect ratio does not skew them
+        h, w = img.shape[:2]
+        scale = np.array([w, h], dtype=np.float32)
+        before = jointAngles(self._keyPrev[:, :2] * scale, MOTION_TRIPLETS)
+        after = jointAngles(self._keyLast[:, :2] * scale, MOTION_TRIPLETS)
+        self.jointVelocity = float(np.max(np.abs(after - before))) / (now - self._keyPrevTime)
+
+        if self.jointVelocity > self.fastVelocity:
+            self.inferInterval = 1
+        elif self.jointVelocity < self.slowVelocity:
+            self.inferInterval = min(self.maxSkip, self.inferInterval + 1)
+
+    def _extrapolate(self):
+        self.isKeyframe = False
+        self._framesSinceKey += 1
+        if self._keyPrevTime is None or not self.results.pose_landmarks:
+            return
+
+        # Linear extrapolation from the last two keyframes, capped at one
+        # keyframe interval ahead so a stale velocity cannot run away
+        span = self._keyLastTime - self._keyPrevTime
+        t = min((time.perf_counter() - self._keyLastTime) / span, 1.0) if span > 0 else 0.0
+        pred = self._keyLast + (self._keyLast - self._keyPrev) * t
+        # The last keyframe's landmarks are overwritten in place, so
+        # findPosition and draw_landmarks see the prediction unchanged
+        for lm, (x, y, z, _) in zip(self.results.pose_landmarks.landmark, pred):
+            lm.x, lm.y, lm.z = float(x), float(y), float(z)
+
+    def _toRGB(self, img):
+        # MediaPipe copies the input, so one buffer per input size is enough
+        rgb = self.pool.get('rgb', img.shape)
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=rgb)
+
+    def _processRoi(self, img):
+        h, w = img.shape[:2]
+
+        if self.roiBox is not None:
+            x0, y0, x1, y1 = self.roiBox
+            crop = img[y0:y1, x0:x1]
+            cw, ch = x1 - x0, y1 - y0
+            scale = self.roiMaxSize / max(cw, ch)
+            if scale < 1:
+                size = (max(1, int(cw * scale)), max(1, int(ch * scale)))
+                crop = cv2.resize(crop, size, dst=self.pool.get('roi', (size[1], size[0], 3)),
+                                  interpolation=cv2.INTER_AREA)
+            results = self.pose.process(self._toRGB(crop))
+
+            if results.pose_landmarks:
+                # Map the crop-relative landmarks back onto the full frame
+                for lm in results.pose_landmarks.landmark:
+                    lm.x = (x0 + lm.x * cw) / w
+                    lm.y = (y0 + lm.y * ch) / h
+                    lm.z = lm.z * cw / w
+                self._updateRoi(results, w, h)
+                return results
+
+        # No ROI yet or tracking was lost, so detect on the full frame
+        results = self.pose.process(self._toRGB(img))
+        self.roiBox = None
+        self._updateRoi(results, w, h)
+        return results
+
+    def _updateRoi(self, results, w, h):
+        if not results.pose_landmarks:
+            self.roiBox = None
+            return
+
+        xs, ys = [], []
+        for lm in results.pose_landmarks.landmark:
+            if lm.visibility >= self.roiMinVisibility:
+                xs.append(lm.x * w)
+                ys.append(lm.y * h)
+        if not xs:
+            self.roiBox = None
+            return
+
+        # The margin scales with the body plus a small fixed padding, so that
+        # thin poses (side-on push-ups) still leave room to move
+        bx0, by0, bx1, by1 = min(xs), min(ys), max(xs), max(ys)
+        mx = (bx1 - bx0) * self.roiMargin + 0.05 * w
+        my = (by1 - by0) * self.roiMargin + 0.05 * h
+        box = (max(0, int(bx0 - mx)), max(0, int(by0 - my)),
+               min(w, int(bx1 + mx)), min(h, int(by1 + my)))
+        if box[2] - box[0] < 2 or box[3] - box[1] < 2:
+            self.roiBox = None
+            return
+
+        # Keep the current crop while the person stays inside it and it is not
+        # much larger than needed, so MediaPipe's own tracking and smoothing
+        # see a stable input instead of one that shifts every frame
+        if self.roiBox is not None:
+            x0, y0, x1, y1 = self.roiBox
+            inside = x0 <= bx0 and y0 <= by0 and bx1 <= x1 and by1 <= y1
+            area = (x1 - x0) * (y1 - y0)
+            needed = (box[2] - box[0]) * (box[3] - box[1])
+            if inside and area <= 2 * needed:
+                return
+        self.roiBox = box
+
+    def findPosition(self, img, draw=True, asArray=False):
+        """
+        Returns the landmarks of the last findPose call.
+
+        By default this is a list of [id, cx, cy] entries. With asArray=True
+        the preallocated (33, 4) float32 buffer self.lmArray is filled in place
+        and returned instead, with self.lmNorm holding the normalized values.
+        When no person was detected an empty view of that buffer is returned,
+        so len() checks behave the same in both modes.
+        """
+        if asArray:
+            return self._fillArray(img, draw)
+
         self.lmList = []
         if self.results.pose_landmarks:
+            #finding height, width of the image printed
+            h, w, c = img.shape
             for id, lm in enumerate(self.results.pose_landmarks.landmark):
-                #finding height, width of the image printed
-                h, w, c = img.shape
                 #Determining the pixels of the landmarks
                 cx, cy = int(lm.x * w), int(lm.y * h)
                 self.lmList.append([id, cx, cy])
                 if draw:
                     cv2.circle(img, (cx, cy), 5, (255,0,0), cv2.FILLED)
         return self.lmList
-        
+
+    def _fillArray(self, img, draw):
+        if not self.results.pose_landmarks:
+            self.lmList = self.lmArray[:0]
+            return self.lmList
+
+        norm = self.lmNorm
+        for id, lm in enumerate(self.results.pose_landmarks.landmark):
+            norm[id] = (lm.x, lm.y, lm.z, lm.visibility)
+
+        # z uses roughly the same scale as x, so it is scaled by the width
+        h, w = img.shape[:2]
+        self._lmScale[:3] = (w, h, w)
+        np.multiply(norm, self._lmScale, out=self.lmArray)
+        self.lmList = self.lmArray
+
+        if draw:
+            for cx, cy in self.lmArray[:, :2].astype(int):
+                cv2.circle(img, (cx, cy), 5, (255,0,0), cv2.FILLED)
+        return self.lmList
+
+    def _point(self, p):
+        # list entries are [id, cx, cy], array rows are [x, y, z, visibility]
+        if isinstance(self.lmList, np.ndarray):
+            return int(self.lmList[p, 0]), int(self.lmList[p, 1])
+        return tuple(self.lmList[p][1:])
+
     def findAngle(self, img, p1, p2, p3, draw=True):   
         #Get the landmarks
-        x1, y1 = self.lmList[p1][1:]
-        x2, y2 = self.lmList[p2][1:]
-        x3, y3 = self.lmList[p3][1:]
+        x1, y1 = self._point(p1)
+        x2, y2 = self._point(p2)
+        x3, y3 = self._point(p3)
         
         #Calculate Angle
         angle = math.degrees(math.atan2(y3-y2, x3-x2) - 
@@ -70,20 +452,43 @@ class poseDetector() :
         
         #Draw
         if draw:
-            cv2.line(img, (x1, y1), (x2, y2), (255,255,255), 3)
-            cv2.line(img, (x3, y3), (x2, y2), (255,255,255), 3)
-
-            
-            cv2.circle(img, (x1, y1), 5, (0,0,255), cv2.FILLED)
-            cv2.circle(img, (x1, y1), 15, (0,0,255), 2)
-            cv2.circle(img, (x2, y2), 5, (0,0,255), cv2.FILLED)
-            cv2.circle(img, (x2, y2), 15, (0,0,255), 2)
-            cv2.circle(img, (x3, y3), 5, (0,0,255), cv2.FILLED)
-            cv2.circle(img, (x3, y3), 15, (0,0,255), 2)
-            
-            cv2.putText(img, str(int(angle)), (x2-50, y2+50), 
-                        cv2.FONT_HERSHEY_PLAIN, 2, (0,0,255), 2)
+            self._drawAngle(img, (x1, y1), (x2, y2), (x3, y3), angle)
         return angle
+
+    def findAngles(self, triplets):
+        """
+        Returns the angles of every [p1, p2, p3] row of the (N, 3) index array
+        triplets in one NumPy pass, measured at p2 the same way as findAngle.
+        Nothing is drawn here; use drawAngles for that.
+        """
+        if isinstance(self.lmList, np.ndarray):
+            pts = self.lmList[:, :2]
+        else:
+            pts = np.array(self.lmList, dtype=np.float32)[:, 1:]
+
+        return jointAngles(pts, triplets)
+
+    def drawAngles(self, img, triplets, angles):
+        """Draws the joints and angle values returned by findAngles."""
+        for (p1, p2, p3), angle in zip(triplets, angles):
+            self._drawAngle(img, self._point(p1), self._point(p2),
+                            self._point(p3), angle)
+        return img
+
+    def _drawAngle(self, img, pt1, pt2, pt3, angle):
+        (x1, y1), (x2, y2), (x3, y3) = pt1, pt2, pt3
+        cv2.line(img, (x1, y1), (x2, y2), (255,255,255), 3)
+        cv2.line(img, (x3, y3), (x2, y2), (255,255,255), 3)
+
+        cv2.circle(img, (x1, y1), 5, (0,0,255), cv2.FILLED)
+        cv2.circle(img, (x1, y1), 15, (0,0,255), 2)
+        cv2.circle(img, (x2, y2), 5, (0,0,255), cv2.FILLED)
+        cv2.circle(img, (x2, y2), 15, (0,0,255), 2)
+        cv2.circle(img, (x3, y3), 5, (0,0,255), cv2.FILLED)
+        cv2.circle(img, (x3, y3), 15, (0,0,255), 2)
+
+        cv2.putText(img, str(int(angle)), (x2-50, y2+50),
+                    cv2.FONT_HERSHEY_PLAIN, 2, (0,0,255), 2)
         
 
 def main():
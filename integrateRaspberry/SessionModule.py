@@ -0,0 +1,136 @@
+"""
+Workout sessions of the server. Every workout is a workoutSession with
+its own lock, lifecycle state and resources (the runner streaming it,
+its heart rate buffer and sampler, ...), registered in a sessionManager
+by session ID. A station (a camera and the person in front of it) runs
+one session at a time, and different stations run theirs independently.
+
+Lifecycle:
+
+    starting -> running <-> paused
+       |           |          |
+       v           v          v
+     failed <-- stopping <----+
+                   |
+                   v
+                stopped
+"""
+
+import threading
+import time
+import uuid
+
+STARTING = "starting"
+RUNNING = "running"
+PAUSED = "paused"
+STOPPING = "stopping"
+STOPPED = "stopped"
+FAILED = "failed"
+
+TRANSITIONS = {
+    STARTING: (RUNNING, FAILED),
+    RUNNING: (PAUSED, STOPPING),
+    PAUSED: (RUNNING, STOPPING),
+    STOPPING: (STOPPED, FAILED),
+    STOPPED: (),
+    FAILED: (),
+}
+FINAL = (STOPPED, FAILED)
+
+class sessionStateError(RuntimeError):
+    """Raised for a request the session cannot take in its current state."""
+
+
+class workoutSession() :
+    """
+    One workout on one station. info holds the public status fields
+    (stream status, URLs, counts, ...), resources everything the session
+    owns. lock serializes the lifecycle calls of this session only, so a
+    slow stop on one station never holds up another.
+    """
+
+    def __init__(self, manager, workout, station):
+        self.manager = manager
+        self.sessionId = uuid.uuid4().hex
+        self.workout = workout
+        self.station = station
+        self.state = STARTING
+        self.created = time.time()
+        self.info = {}
+        self.resources = {}
+        self.version = 0
+        self.lock = threading.RLock()
+        self.stopped = threading.Event()  # set once the session is final
+
+    def transition(self, state, **info):
+        """Moves to state (updating info), or raises sessionStateError if that is not allowed."""
+        with self.lock:
+            if state not in TRANSITIONS[self.state]:
+                raise sessionStateError(f"Session is {self.state}, cannot become {state}")
+            self.state = state
+            if state in FINAL:
+                self.stopped.set()
+            self.update(**info)
+            if state in FINAL:
+                self.manager.release(self)
+
+    def update(self, **info):
+        """Changes public status fields and wakes up everyone waiting on the session."""
+        with self.manager.changed:
+            self.info.update(info)
+            self.version += 1
+            self.manager.changed.notify_all()
+
+    def isActive(self):
+        return self.state not in FINAL
+
+    def status(self):
+        return {"session_id": self.sessionId, "workout": self.workout, "station": self.station,
+                "state": self.state, "created": self.created, **self.info}
+
+
+class sessionManager() :
+    """
+    Registry of sessions by ID and of the active session per station.
+    Finished sessions are kept for status lookups, up to keepFinished.
+    """
+
+    def __init__(self, keepFinished=200):
+        self.keepFinished = keepFinished
+        self.sessions = {}  # session ID -> workoutSession
+        self.stations = {}  # station -> its active workoutSession
+        self.changed = threading.Condition()
+
+    def create(self, workout, station, **info):
+        """Registers a starting session, or raises sessionStateError if the station is busy."""
+        with self.changed:
+            active = self.stations.get(station)
+            if active is not None:
+                raise sessionStateError(f"Station {station} is running session {active.sessionId}")
+            session = workoutSession(self, workout, station)
+            session.info.update(info)
+            self.sessions[session.sessionId] = session
+            self.stations[station] = session
+            self._prune()
+            return session
+
+    def release(self, session):
+        """Frees the station of a session that reached a final state."""
+        with self.changed:
+            if self.stations.get(session.station) is session:
+                del self.stations[session.station]
+
+    def get(self, sessionId):
+        return self.sessions.get(sessionId)
+
+    def active(self, station):
+        return self.stations.get(station)
+
+    def list(self):
+        with self.changed:
+            return list(self.sessions.values())
+
+    def _prune(self):
+        finished = [s for s in self.sessions.values() if not s.isActive()]
+        for session in sorted(finished, key=lambda s: s.created)[:max(len(finished) - self.keepFinished, 0)]:
+            del self.sessions[session.sessionId]
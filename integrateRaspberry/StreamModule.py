@@ -0,0 +1,563 @@
+"""
+Writes raw video frames to an FFmpeg process from a background thread, so a
+stalled encoder or uplink never blocks pose detection.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from FrameModule import framePool
+
+# Where encoderSupervisor publishes its latest metrics for other processes,
+# e.g. the Flask server, to read
+ENCODER_STATS_FILE = 'encoder_stats.json'
+
+# FFmpeg global options that make it report progress as key=value blocks on
+# stdout, which encoderSupervisor parses, instead of the stderr stats line
+PROGRESS_ARGS = ['-progress', 'pipe:1', '-nostats']
+
+# H.264 encoders in order of preference, cheapest for the CPU first, with the
+# options that keep each of them at low latency
+H264_ENCODERS = ['h264_v4l2m2m', 'h264_omx', 'libx264']
+ENCODER_OPTIONS = {
+    'h264_v4l2m2m': ['-pix_fmt', 'yuv420p'],
+    'h264_omx': ['-pix_fmt', 'yuv420p', '-zerocopy', '1'],
+    'libx264': ['-preset', 'ultrafast', '-tune', 'zerolatency', '-pix_fmt', 'yuv420p'],
+}
+
+# Named latency/bitrate trade-offs; the GOP is given in seconds so it follows
+# the frame rate
+STREAM_PROFILES = {
+    'lowlatency': {'bitrate': '1500k', 'maxrate': '1500k', 'bufsize': '750k', 'gop_seconds': 1},
+    'balanced': {'bitrate': '2500k', 'maxrate': '3000k', 'bufsize': '3000k', 'gop_seconds': 2},
+    'quality': {'bitrate': '4500k', 'maxrate': '6800k', 'bufsize': '7000k', 'gop_seconds': 2},
+}
+
+# Raw input formats streamWriter can send, with the cv2 conversion from
+# OpenCV's native BGR (None: sent as is). bgr24 leaves the conversion to
+# FFmpeg, which has to convert to yuv420p for H.264 anyway; yuv420p does that
+# single conversion here and halves the bytes written to the pipe.
+PIXEL_FORMATS = {
+    'bgr24': None,
+    'rgb24': cv2.COLOR_BGR2RGB,
+    'yuv420p': cv2.COLOR_BGR2YUV_I420,
+}
+
+
+def frameShape(pixFmt, size):
+    """Array shape of one raw frame of the given (width, height) in pixFmt."""
+    width, height = size
+    if pixFmt == 'yuv420p':
+        # Y plane followed by the quarter-size U and V planes
+        return (height * 3 // 2, width)
+    return (height, width, 3)
+
+# Probe results are cached on disk, since every workout starts a new process.
+# Only complete results are: if an encoder FFmpeg lists could not be opened
+# (e.g. the hardware encoder was busy), it is probed again after
+# FAILED_PROBE_TTL seconds instead of being ruled out for good.
+ENCODER_CACHE_FILE = os.path.join(os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                                  'integrateRaspberry', 'ffmpeg_encoders.json')
+FAILED_PROBE_TTL = 300
+_encoderCache = {}  # key -> (available, probed at, whether every listed encoder worked)
+_probes = {}  # key -> thread of a probe running in the background
+_probeLock = threading.Lock()
+
+
+def _ffmpegKey(ffmpeg):
+    path = shutil.which(ffmpeg) or ffmpeg
+    try:
+        return f"{os.path.realpath(path)}:{os.path.getmtime(path)}"
+    except OSError:
+        return path
+
+
+def _encoderWorks(ffmpeg, encoder):
+    # Hardware encoders are often listed without the device behind them, so
+    # encode a single tiny frame to be sure
+    command = [ffmpeg, '-hide_banner', '-loglevel', 'error',
+               '-f', 'lavfi', '-i', 'color=size=320x240:rate=1',
+               '-frames:v', '1', '-c:v', encoder, *ENCODER_OPTIONS.get(encoder, []),
+               '-f', 'null', '-']
+    try:
+        return subprocess.run(command, capture_output=True, timeout=15).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def _readEncoderCache(cacheFile):
+    if not cacheFile:
+        return {}
+    try:
+        with open(cacheFile) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _cachedProbe(key, cacheFile):
+    """The (available, probed at, complete) of the last probe in memory or cacheFile, or None."""
+    cached = _encoderCache.get(key)
+    if cached is None:
+        cache = _readEncoderCache(cacheFile)
+        if key in cache:
+            cached = _encoderCache[key] = (cache[key], time.time(), True)
+    return cached
+
+
+def _probe(ffmpeg, key, cacheFile):
+    try:
+        listing = subprocess.run([ffmpeg, '-hide_banner', '-encoders'],
+                                 capture_output=True, text=True, timeout=15).stdout
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Could not probe FFmpeg encoders: {e}")
+        return []
+
+    # Lines look like " V....D libx264    libx264 H.264 / AVC ..."
+    listed = {line.split()[1] for line in listing.splitlines()
+              if len(line.split()) > 1 and line.split()[0].startswith('V')}
+    candidates = [name for name in H264_ENCODERS if name in listed]
+    available = [name for name in candidates if _encoderWorks(ffmpeg, name)]
+    complete = available == candidates
+    if not complete:
+        print(f"FFmpeg encoders that could not be opened: {sorted(set(candidates) - set(available))}, "
+              f"probing again in {FAILED_PROBE_TTL}s")
+
+    _encoderCache[key] = (available, time.time(), complete)
+    if cacheFile and complete:
+        cache = _readEncoderCache(cacheFile)
+        cache[key] = available
+        try:
+            os.makedirs(os.path.dirname(cacheFile) or '.', exist_ok=True)
+            with open(cacheFile, 'w') as f:
+                json.dump(cache, f)
+        except OSError as e:
+            print(f"Could not cache FFmpeg encoders in {cacheFile}: {e}")
+    return available
+
+
+def _probeInBackground(ffmpeg, key, cacheFile):
+    try:
+        _probe(ffmpeg, key, cacheFile)
+    finally:
+        with _probeLock:
+            _probes.pop(key, None)
+
+
+def probeEncoders(ffmpeg='ffmpeg', cacheFile=ENCODER_CACHE_FILE, wait=True):
+    """
+    Returns the H264_ENCODERS that this FFmpeg build lists in -encoders and
+    can actually open, in preference order. Results are cached per FFmpeg
+    binary in memory and, when every listed encoder could be opened, in
+    cacheFile.
+
+    Probing takes up to a few encoder trials of 15 s each. With wait=False a
+    due probe runs on a background thread instead, and the last known result
+    (None if there is none yet) is returned right away.
+    """
+    key = _ffmpegKey(ffmpeg)
+    cached = _cachedProbe(key, cacheFile)
+    if cached is not None and (cached[2] or time.time() - cached[1] < FAILED_PROBE_TTL):
+        return cached[0]
+
+    with _probeLock:
+        running = _probes.get(key)
+        if running is None and not wait:
+            running = _probes[key] = threading.Thread(target=_probeInBackground,
+                                                      args=(ffmpeg, key, cacheFile), daemon=True)
+            running.start()
+    if not wait:
+        return cached[0] if cached is not None else None
+    if running is not None:
+        running.join()
+        return _encoderCache.get(key, ([],))[0]
+    return _probe(ffmpeg, key, cacheFile)
+
+
+def selectEncoder(ffmpeg='ffmpeg', wait=False):
+    """
+    Returns the cheapest working H.264 encoder, or None to use FFmpeg's
+    default. Unless wait is set, a stream never waits for the encoder probe:
+    until it has a result, FFmpeg's default is used.
+    """
+    available = probeEncoders(ffmpeg, wait=wait)
+    if available is None:
+        print("Probing the H.264 encoders in the background, using FFmpeg's default for now.")
+        return None
+    if not available:
+        print("No preferred H.264 encoder found, using FFmpeg's default.")
+        return None
+    return available[0]
+
+
+def buildFfmpegCommand(output, size=(1280, 720), fps=15, pixFmt='bgr24',
+                       profile='lowlatency', encoder=None, audioDevice=None,
+                       audioFormat='alsa', ffmpeg='ffmpeg'):
+    """
+    Returns the FFmpeg command that reads raw pixFmt frames of size from
+    stdin and encodes them with the named STREAM_PROFILES entry.
+
+    output can be an RTMP URL or a local file; RTMP and .flv outputs are
+    muxed as FLV, anything else by its extension. encoder defaults to
+    selectEncoder(). Without an audioDevice the stream is video only, which
+    is how it runs on a machine without the Pi's sound card.
+    """
+    settings = STREAM_PROFILES[profile]
+    encoder = encoder or selectEncoder(ffmpeg)
+    gop = str(int(fps * settings['gop_seconds']))
+
+    command = [
+        ffmpeg,
+        '-y',
+        *PROGRESS_ARGS,
+        '-f', 'rawvideo',
+        '-pix_fmt', pixFmt,
+        '-s', f'{size[0]}x{size[1]}',
+        '-r', str(fps),
+        '-i', 'pipe:0',
+    ]
+    if audioDevice:
+        command += ['-f', audioFormat, '-i', audioDevice]
+
+    if encoder:
+        command += ['-c:v', encoder, *ENCODER_OPTIONS.get(encoder, [])]
+    command += [
+        '-b:v', settings['bitrate'],
+        '-maxrate', settings['maxrate'],
+        '-bufsize', settings['bufsize'],
+        '-g', gop,
+        '-keyint_min', gop,
+        '-bf', '0',  # B-frames add a frame of delay
+    ]
+    if audioDevice:
+        command += ['-c:a', 'aac', '-b:a', '128k', '-ar', '44100']
+
+    if output.startswith('rtmp') or output.endswith('.flv'):
+        command += ['-f', 'flv']
+    command.append(output)
+    return command
+
+
+def startFfmpeg(command):
+    """Starts FFmpeg the way streamWriter expects: unbuffered stdin, piped output."""
+    return subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0  # streamWriter sends whole frames itself
+    )
+
+
+def readEncoderStats(path=ENCODER_STATS_FILE):
+    """Returns the metrics last published by an encoderSupervisor, or None."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _number(value, suffix=''):
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class encoderSupervisor() :
+    """
+    Continuously drains an FFmpeg process's stdout and stderr so neither pipe
+    can fill up and stall the encoder.
+
+    stdout carries the -progress blocks, which are turned into metrics (encode
+    fps, bitrate, speed, dropped and duplicated frames); stderr lines are kept
+    in a short backlog for diagnosing failures. When statsFile is set, every
+    progress block is also written there as JSON.
+    """
+
+    def __init__(self, process, statsFile=None):
+        self.process = process
+        self.statsFile = statsFile
+        self.stats = {}
+        self.log = deque(maxlen=50)
+        self.publishErrors = 0
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._readProgress, daemon=True),
+            threading.Thread(target=self._readLog, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _readProgress(self):
+        block = {}
+        for line in iter(self.process.stdout.readline, b''):
+            key, _, value = line.decode(errors='replace').strip().partition('=')
+            block[key] = value
+            if key == 'progress':
+                self._publish(block)
+                block = {}
+
+    def _readLog(self):
+        for line in iter(self.process.stderr.readline, b''):
+            line = line.decode(errors='replace').rstrip()
+            if line:
+                self.log.append(line)
+
+    def _publish(self, block):
+        stats = {
+            "frame": int(_number(block.get('frame', '0')) or 0),
+            "fps": _number(block.get('fps', '')),
+            "bitrate_kbps": _number(block.get('bitrate', ''), 'kbits/s'),
+            "speed": _number(block.get('speed', ''), 'x'),
+            "total_size": int(_number(block.get('total_size', '0')) or 0),
+            "drop_frames": int(_number(block.get('drop_frames', '0')) or 0),
+            "dup_frames": int(_number(block.get('dup_frames', '0')) or 0),
+            "out_time": block.get('out_time'),
+            "state": block.get('progress'),
+            "updated": time.time(),
+        }
+        with self._lock:
+            self.stats = stats
+        if self.statsFile:
+            # Write then rename, so readers never see a half-written file. A
+            # failed write must not end the drain, or FFmpeg's pipe fills up
+            tmp = f"{self.statsFile}.tmp"
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump(stats, f)
+                os.replace(tmp, self.statsFile)
+            except OSError as e:
+                self.publishErrors += 1
+                if self.publishErrors == 1:
+                    print(f"Could not publish encoder metrics to {self.statsFile}: {e}")
+
+    def join(self, timeout=2):
+        """Waits until FFmpeg's pipes are drained, i.e. it has exited."""
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def metrics(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["last_log"] = self.log[-1] if self.log else None
+        return stats
+
+
+class streamWriter() :
+    """
+    Feeds frames to the stdin of an FFmpeg process started by startProcess.
+
+    write() converts the BGR frame to pixFmt (see PIXEL_FORMATS) straight into
+    one of a few preallocated slots, resizing first only if it is not already
+    size (width, height), and returns immediately. A bgr24 frame that already
+    has the right size is queued as is, without any copy, so the caller must
+    not modify it afterwards. The writer thread sends frames to FFmpeg through
+    a memoryview, so no per-frame bytes object is created. When `slots` frames
+    are already waiting, the oldest one is dropped so the stream stays as
+    close to live as possible. If FFmpeg exits or its pipe breaks, it is
+    restarted.
+
+    Counters: written and dropped frames, and stalledTime, the total seconds
+    writes spent blocked beyond one frame interval. FFmpeg's own output is
+    drained by an encoderSupervisor, see encoderMetrics().
+    """
+
+    def __init__(self, startProcess, size=(1280, 720), pixFmt='bgr24', slots=3, fps=15,
+                 statsFile=ENCODER_STATS_FILE):
+        self.startProcess = startProcess
+        self.size = size
+        self.pixFmt = pixFmt
+        self.pool = framePool()
+        self.interval = 1.0 / fps
+        self.statsFile = statsFile
+        self.process = None
+        self.supervisor = None
+        self.written = 0
+        self.dropped = 0
+        self.stalledTime = 0.0
+        self.restarts = 0
+        self.slots = slots
+        # One more buffer than can be pending, for the frame being sent
+        self._buffers = [np.empty(frameShape(pixFmt, size), dtype=np.uint8)
+                         for _ in range(slots + 1)]
+        self._free = deque(self._buffers)
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+
+    def _startProcess(self):
+        # startProcess must pipe stdout and stderr and pass PROGRESS_ARGS
+        self.process = self.startProcess()
+        self.supervisor = encoderSupervisor(self.process, self.statsFile)
+
+    def open(self):
+        self._startProcess()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self, frame):
+        """Queues frame for FFmpeg; returns False if an older frame had to be dropped."""
+        width, height = self.size
+        direct = PIXEL_FORMATS[self.pixFmt] is None and frame.shape[:2] == (height, width) \
+            and frame.flags.c_contiguous
+
+        with self._cond:
+            dropped = len(self._pending) >= self.slots
+            if dropped:
+                self._recycle(self._pending.popleft())
+                self.dropped += 1
+            slot = None if direct else self._free.popleft()
+
+        buf = frame if direct else self.prepare(frame, slot)
+
+        with self._cond:
+            self._pending.append(buf)
+            self._cond.notify()
+        return not dropped
+
+    def _recycle(self, buf):
+        # Only our own buffers go back to the free list, queued frames are let go
+        if any(buf is own for own in self._buffers):
+            self._free.append(buf)
+
+    def prepare(self, frame, out):
+        """Resizes (if needed) and converts a BGR frame into the raw frame out."""
+        width, height = self.size
+        if frame.shape[:2] != (height, width):
+            frame = cv2.resize(frame, (width, height),
+                               dst=self.pool.get('resized', (height, width) + frame.shape[2:]))
+        code = PIXEL_FORMATS[self.pixFmt]
+        if code is None:
+            np.copyto(out, frame)
+        else:
+            cv2.cvtColor(frame, code, dst=out)
+        return out
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or not self._running)
+                if not self._running:
+                    break
+                slot = self._pending.popleft()
+
+            if self.process.poll() is not None:
+                self._restart()
+
+            start = time.perf_counter()
+            try:
+                self._send(memoryview(slot).cast('B'))
+            except (OSError, ValueError) as e:
+                print(f"Error writing to FFmpeg: {e}")
+                self._restart()
+            else:
+                self.written += 1
+            elapsed = time.perf_counter() - start
+            if elapsed > self.interval:
+                self.stalledTime += elapsed - self.interval
+
+            with self._cond:
+                self._recycle(slot)
+
+    def _send(self, view):
+        stdin = self.process.stdin
+        # Unbuffered pipes may accept only part of a frame per call
+        while view:
+            n = stdin.write(view)
+            view = view[n:]
+        stdin.flush()
+
+    def _restart(self):
+        if not self._running:
+            return
+        print("FFmpeg process closed. Reinitializing...")
+        self._terminate()
+        time.sleep(min(self.restarts, 5))  # back off if FFmpeg keeps failing
+        self.restarts += 1
+        self._startProcess()
+
+    def _terminate(self):
+        process = self.process
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                process.stdin.close()
+                process.terminate()
+                process.wait(timeout=5)
+            if process.poll() is None:
+                process.kill()
+        except Exception as e:
+            print(f"Error during FFmpeg process termination: {e}")
+
+    def encoderMetrics(self):
+        """Latest FFmpeg progress metrics, see encoderSupervisor."""
+        return self.supervisor.metrics() if self.supervisor is not None else {}
+
+    def metrics(self):
+        return {
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+            "stalled_s": self.stalledTime,
+            "restarts": self.restarts,
+        }
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        print("Terminating FFmpeg process...")
+        self._terminate()
+        # Metrics of a finished stream would only mislead later readers; the
+        # supervisor may still be publishing FFmpeg's last progress block
+        if self.supervisor is not None:
+            self.supervisor.join()
+        if self.statsFile and os.path.exists(self.statsFile):
+            os.remove(self.statsFile)
+
+
+def main():
+    """
+    Streams a few seconds of test frames, e.g. to try a profile on a plain
+    Linux box: python StreamModule.py out.flv lowlatency bgr24
+    (or rtmp://localhost/live/test with a local RTMP server)
+    """
+    output = sys.argv[1] if len(sys.argv) > 1 else 'stream_test.flv'
+    profile = sys.argv[2] if len(sys.argv) > 2 else 'lowlatency'
+    pixFmt = sys.argv[3] if len(sys.argv) > 3 else 'bgr24'
+    command = buildFfmpegCommand(output, profile=profile, pixFmt=pixFmt)
+    print(' '.join(command))
+
+    writer = streamWriter(lambda: startFfmpeg(command), pixFmt=pixFmt, statsFile=None).open()
+    for i in range(15 * 5):
+        # A new frame every time: write() may queue the array itself, so a
+        # frame must not be changed once it was written
+        frame = np.full((720, 1280, 3), (i * 3) % 256, dtype=np.uint8)
+        writer.write(frame)
+        time.sleep(1 / 15)
+    time.sleep(1)
+    print(writer.metrics())
+    print(writer.encoderMetrics())
+    writer.close()
+
+if __name__ == "__main__":
+    main()
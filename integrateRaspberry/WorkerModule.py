@@ -0,0 +1,212 @@
+"""
+Pool of workout processes started ahead of time. Each worker has already
+imported MediaPipe/OpenCV and built its pose model, and waits for the
+exercise to begin, so a workout starts without paying for interpreter and
+model startup.
+
+The server and a worker talk over an IpcModule.messageChannel:
+
+    server -> worker   {"type": "start", "exercise": ..., "camera": ..., "output": ...,
+                        "audio_device": ..., "stats_file": ...}, {"type": "stop"},
+                       {"type": "pause"}, {"type": "resume"}
+    worker -> server   {"type": "ready"}, {"type": "started", "exercise": ...},
+                       {"type": "attempt" | "rep" | "invalid", "value": ..., "progress": {...}},
+                       {"type": "paused"}, {"type": "resumed"},
+                       {"type": "summary", ...exerciseEngine.summary()},
+                       {"type": "error", "message": ...}
+"""
+
+import subprocess
+import sys
+import threading
+from collections import deque
+import IpcModule as ipc
+
+class workoutWorker() :
+    """
+    One `python workout.py --worker` process and its message channel.
+    Once begin() has started the workout, it takes the same stop, pause,
+    resume and progress calls as WorkoutModule.workoutRuntime.
+    Worker output is forwarded to our stdout (prefixed with the pid) so the
+    pipe never fills up. ready is set once the model is loaded, and
+    finished once the summary has arrived (both are also set, with closed,
+    when the worker exits).
+    """
+
+    def __init__(self, script='workout.py', onMessage=None):
+        self.channel, child = ipc.channelPair()
+        self.process = subprocess.Popen([sys.executable, '-u', script, '--worker', str(child.fileno())],
+                                        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, pass_fds=(child.fileno(),))
+        child.close()
+
+        self.onMessage = onMessage
+        self.exercise = None
+        self.lastProgress = {}
+        self.events = deque(maxlen=50)
+        self.summary = None
+        self.error = None
+        self.closed = False
+        self.ready = threading.Event()
+        self.finished = threading.Event()
+        self._replies = {}  # reply type -> Event
+        threading.Thread(target=self._forward, daemon=True).start()
+        threading.Thread(target=self._receive, daemon=True).start()
+
+    def _forward(self):
+        for line in iter(self.process.stdout.readline, b''):
+            print(f"[worker {self.process.pid}] {line.decode(errors='replace').rstrip()}")
+
+    def _receive(self):
+        while True:
+            message = self.channel.recv()
+            if message is None:
+                break
+            kind = message.get("type")
+            if kind == "ready":
+                self.ready.set()
+            elif kind == "summary":
+                self.summary = message
+                self.finished.set()
+            elif kind == "error":
+                self.error = message.get("message")
+                print(f"[worker {self.process.pid}] error: {self.error}")
+            elif "progress" in message:
+                self.lastProgress = message["progress"]
+                self.events.append(message)
+            if self.onMessage is not None:
+                self.onMessage(message)
+            # An error answers a pending start
+            reply = self._replies.pop("started" if kind == "error" else kind, None)
+            if reply is not None:
+                reply.set()
+        # The worker is gone; wake up anyone still waiting on it
+        self.closed = True
+        self.ready.set()
+        self.finished.set()
+        for reply in self._replies.values():
+            reply.set()
+
+    def _request(self, message, reply, timeout):
+        event = self._replies[reply] = threading.Event()
+        if not self.channel.send(message):
+            return False
+        return event.wait(timeout)
+
+    def isAlive(self):
+        return self.process.poll() is None
+
+    def progress(self):
+        """Live state of the workout, as of the worker's last rep event."""
+        return self.lastProgress
+
+    def begin(self, exercise, camera=None, output=None, audioDevice=None, statsFile=None, timeout=10):
+        """
+        Hands the workout to the worker and waits until it is streaming. camera,
+        output, audioDevice and statsFile (where the worker publishes its
+        encoder metrics) override the worker's defaults where given.
+        """
+        self.error = None
+        message = {"type": "start", "exercise": exercise}
+        for field, value in (("camera", camera), ("output", output), ("audio_device", audioDevice),
+                             ("stats_file", statsFile)):
+            if value is not None:
+                message[field] = value
+        if not self._request(message, "started", timeout) or self.error:
+            self.terminate()
+            raise RuntimeError(self.error or "Workout worker did not start")
+        self.exercise = exercise
+        return self
+
+    def pause(self, timeout=2):
+        return self._request({"type": "pause"}, "paused", timeout)
+
+    def resume(self, timeout=2):
+        return self._request({"type": "resume"}, "resumed", timeout)
+
+    def stop(self, timeout=10):
+        """Stops the workout and returns its summary as soon as the worker sends it."""
+        self.channel.send({"type": "stop"})
+        if not self.finished.wait(timeout):
+            print(f"Workout worker {self.process.pid} did not answer, terminating it")
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+        self.terminate()
+        self.channel.close()
+        return self.summary
+
+    def terminate(self, timeout=2):
+        if self.isAlive():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class workerPool() :
+    """
+    Keeps size idle workers warm. acquire() hands out a ready worker
+    (waiting for one if they are all still loading) and starts its
+    replacement in the background.
+    """
+
+    def __init__(self, size=1, script='workout.py'):
+        self.size = size
+        self.script = script
+        self.spawned = 0
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._spawn()
+
+    def _spawn(self):
+        worker = workoutWorker(self.script)
+        with self._lock:
+            if self._closed:
+                worker.terminate()
+                return
+            self._idle.append(worker)
+            self.spawned += 1
+
+    def acquire(self, timeout=30):
+        """Returns a ready worker, or raises RuntimeError if none gets ready in time."""
+        with self._lock:
+            # Workers that crashed while idle are replaced
+            dead = [w for w in self._idle if w.closed or not w.isAlive()]
+            for w in dead:
+                self._idle.remove(w)
+            for _ in dead:
+                threading.Thread(target=self._spawn, daemon=True).start()
+            ready = [w for w in self._idle if w.ready.is_set()]
+            worker = ready[0] if ready else (self._idle[0] if self._idle else None)
+            if worker is not None:
+                self._idle.remove(worker)
+
+        if worker is None:
+            # Nothing left to hand out, start one in the foreground
+            worker = workoutWorker(self.script)
+            with self._lock:
+                self.spawned += 1
+        else:
+            threading.Thread(target=self._spawn, daemon=True).start()
+
+        if not worker.ready.wait(timeout) or worker.closed:
+            worker.terminate()
+            raise RuntimeError("No workout worker became ready")
+        return worker
+
+    def idle(self):
+        with self._lock:
+            return sum(1 for w in self._idle if w.ready.is_set())
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers = list(self._idle)
+            self._idle.clear()
+        for worker in workers:
+            worker.terminate()
@@ -0,0 +1,399 @@
+"""
+Workout runtime that keeps the pose model (and the camera) warm between
+workouts, so starting an exercise only builds its rep state machine and
+the FFmpeg stream. Used by workout.py on the command line and hosted
+in-process by raspberryWebCamServer.py.
+"""
+
+import os
+import queue
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+from gtts import gTTS
+import PoseModule as pm
+import CameraModule as cm
+import PipelineModule as plm
+import StreamModule as sm
+import ExerciseModule as em
+from exercises import EXERCISES
+
+load_dotenv()
+
+def defaultOutput():
+    """STREAM_OUTPUT, or else the YouTube ingest URL of YOUTUBE_STREAM_KEY."""
+    return os.getenv("STREAM_OUTPUT") or f"rtmp://a.rtmp.youtube.com/live2/{os.getenv('YOUTUBE_STREAM_KEY')}"
+
+def defaultAudioDevice():
+    return os.getenv("AUDIO_DEVICE", "hw:4,1,0")
+
+
+class voiceFeedback() :
+    """
+    Speaks queued messages with gTTS and mpg321 on a background thread.
+    The same message is not repeated within cooldown seconds.
+    """
+
+    def __init__(self, cooldown=5):
+        self.cooldown = cooldown
+        self._queue = queue.Queue()
+        self._lastSpoken = {}
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def say(self, text):
+        now = time.time()
+        if now - self._lastSpoken.get(text, 0) < self.cooldown:
+            return
+        self._lastSpoken[text] = now
+        self._queue.put(text)
+
+    def _run(self):
+        while self._running:
+            try:
+                text = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                tts = gTTS(text=text, lang='en')
+                with tempfile.NamedTemporaryFile(delete=True, suffix='.mp3') as tmpfile:
+                    tts.save(tmpfile.name)
+                    os.system(f"mpg321 -q {tmpfile.name}")
+            except Exception as e:
+                print(f"Could not speak '{text}': {e}")
+
+    def stop(self, timeout=1):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def drawHud(img, engine):
+    """Draws the rep counters, feedback and progress bar of an exerciseEngine."""
+    height, width, _ = img.shape
+    spec = engine.spec
+
+    # Count and attempts in the bottom left corner
+    cv2.rectangle(img, (0, height - 80), (530, height), (255, 255, 255), cv2.FILLED)
+    cv2.putText(img, f'Count: {engine.count}', (10, height - 50), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 0), 2)
+    cv2.putText(img, f'Attempts: {engine.attempts}', (10, height - 15), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 0), 2)
+
+    # Average time per rep, and symmetry from 0 (perfect) to 180
+    cv2.putText(img, f'Avg Time: {engine.avgRepTime():.2f}s', (230, height - 50), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 0), 2)
+    if spec.symmetry:
+        cv2.putText(img, f'Symmetry: {engine.symmetry:.2f}', (230, height - 15), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 0), 2)
+
+    # Feedback in the top right corner
+    cv2.rectangle(img, (width - 400, 0), (width, 40), (255, 255, 255), cv2.FILLED)
+    cv2.putText(img, engine.feedback, (width - 400 + 10, 30), cv2.FONT_HERSHEY_PLAIN, 2, (0, 0, 0), 2)
+
+    # Progress bar, only once the starting position was reached
+    if spec.progress and engine.form:
+        bar = np.interp(engine.progress, (0, 100), (380, 50))
+        cv2.rectangle(img, (width - 60, 50), (width - 40, 380), (237, 149, 100), 3)
+        cv2.rectangle(img, (width - 60, int(bar)), (width - 40, 380), (237, 149, 100), cv2.FILLED)
+        cv2.putText(img, f'{int(engine.progress)}%', (width - 80, 420), cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 255), 2)
+
+def drawStatus(img, detector, writer):
+    """Shows which pose model the governor is running, and how the encoder keeps up."""
+    cv2.putText(img, f'Model: {detector.complexity}', (10, 30), cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 255), 2)
+    encoder = writer.encoderMetrics()
+    if encoder.get('fps') is not None:
+        cv2.putText(img, f"Encode: {encoder['fps']:.0f} fps x{encoder['speed'] or 0:.2f}", (10, 60),
+                    cv2.FONT_HERSHEY_PLAIN, 2, (255, 255, 255), 2)
+
+
+class workoutRuntime() :
+    """
+    Runs one exercise at a time on a long-lived pose detector.
+
+    The detector (and with it the MediaPipe graph) is created and warmed up
+    once. The camera is opened on the first workout and only paused in
+    between. start() and stop() switch exercises; stop() returns the
+    engine summary, and pause()/resume() suspend rep counting in between.
+    With display=True, show() runs the OpenCV window on the calling thread,
+    which has to be the main thread.
+
+    onEvent, if given, is called from the pose stage with every rep event
+    of exerciseEngine.update and the runtime's progress().
+
+    camera is a device index or a path (see CameraModule.parseSource).
+    start() can switch it, and the stream output and audio device, per
+    workout; two runtimes streaming at once need their own. Runtimes of several
+    stations can share an InferenceModule.inferencePool, which then runs
+    their pose inference (each on its own detector) under the stream name
+    name instead of each runtime's pose stage running it itself.
+
+    Stream settings default to the STREAM_OUTPUT, STREAM_PROFILE,
+    STREAM_PIX_FMT and AUDIO_DEVICE environment variables. The encoder
+    metrics are published to statsFile (none if None) for other processes;
+    in-process callers read encoderMetrics().
+    """
+
+    def __init__(self, camera=0, size=(1280, 720), fps=15, display=False,
+                 output=None, profile=None, pixFmt=None, audioDevice=None, onEvent=None,
+                 inference=None, name=None, statsFile=sm.ENCODER_STATS_FILE):
+        self.camera = camera
+        self.name = name or str(camera)
+        self.inference = inference
+        self.size = size
+        self.fps = fps
+        self.display = display
+        self.output = output or defaultOutput()
+        self.profile = profile or os.getenv("STREAM_PROFILE", "lowlatency")
+        self.pixFmt = pixFmt or os.getenv("STREAM_PIX_FMT", "bgr24")
+        self.audioDevice = audioDevice if audioDevice is not None else defaultAudioDevice()
+        self.statsFile = statsFile
+
+        self.onEvent = onEvent
+        self.engine = None
+        self.paused = False
+        self.cap = None
+        self.writer = None
+        self.pipeline = None
+        self.voice = voiceFeedback().start()
+        self._lock = threading.Lock()
+
+        # Crop and pace inference to the tracked person, and drop to a lighter
+        # model whenever inference cannot keep up with the stream
+        start = time.perf_counter()
+        self.detector = pm.poseDetector(roi=True, adaptive=True,
+                                        governor=pm.complexityGovernor(targetFps=fps))
+        self.detector.findPose(np.zeros((size[1], size[0], 3), dtype=np.uint8), False)
+        self.detector.reset()
+        print(f"Pose model ready in {time.perf_counter() - start:.1f}s")
+
+    def isRunning(self):
+        return self.pipeline is not None and any(stage.isAlive() for stage in self.pipeline.stages)
+
+    def start(self, exercise, camera=None, output=None, audioDevice=None, statsFile=None):
+        """
+        Starts streaming and counting reps of exercise, on camera, to output,
+        with audioDevice ('' for none) and publishing to statsFile where given.
+        """
+        with self._lock:
+            if self.pipeline is not None:
+                raise RuntimeError("A workout is already running")
+            if exercise not in EXERCISES:
+                raise ValueError(f"Unknown exercise: {exercise}")
+
+            if camera is not None and camera != self.camera:
+                self.releaseCamera()
+                self.camera = camera
+            if output:
+                self.output = output
+            if audioDevice is not None:
+                self.audioDevice = audioDevice
+            if statsFile:
+                self.statsFile = statsFile
+            if self.cap is None:
+                self.cap = cm.cameraStream(self.camera, width=self.size[0], height=self.size[1])
+            if not self.cap.isOpened():
+                self.cap = None
+                raise RuntimeError(f"Could not open video stream {self.camera}")
+            self.cap.start()
+
+            self.engine = em.exerciseEngine(EXERCISES[exercise])
+            self.paused = False
+            self.detector.reset()
+            try:
+                # Frames are handed to FFmpeg from the writer's own thread, and
+                # dropped rather than queued when the encoder or uplink falls behind
+                self.writer = sm.streamWriter(self._startFfmpeg, size=self.size, fps=self.fps,
+                                              pixFmt=self.pixFmt, statsFile=self.statsFile).open()
+
+                # Capture, pose/rep logic and stream output each run on their own worker thread
+                self.pipeline = plm.framePipeline()
+                self.pipeline.addStage('capture', self._capture)
+                self.pipeline.addStage('pose', self._process)
+                self.pipeline.addStage('stream', self._stream)
+                self.pipeline.start()
+            except Exception:
+                # E.g. FFmpeg is missing; leave the runtime ready for the next workout
+                self._teardown()
+                raise
+            print(f"Workout started: {exercise}")
+            return self
+
+    def _teardown(self):
+        """
+        Stops the pipeline, camera reader and writer of a workout, whichever
+        of them are running, even if stopping one of them fails. Returns the
+        writer.
+        """
+        pipeline, writer = self.pipeline, self.writer
+        self.pipeline = self.writer = None
+        try:
+            # First, as it wakes up the capture stage waiting for a frame
+            self.cap.stop()
+        finally:
+            try:
+                if pipeline is not None:
+                    pipeline.stop()
+            finally:
+                if writer is not None:
+                    writer.close()
+        return writer
+
+    def stop(self):
+        """Stops the running workout and returns its summary, or None if none was running."""
+        with self._lock:
+            if self.pipeline is None:
+                return None
+            writer = self._teardown()
+            print(f"Camera frames dropped: {self.cap.dropped} of {self.cap.captured}")
+            print(f"Stream frames written: {writer.written}, dropped: {writer.dropped}, "
+                  f"stalled: {writer.stalledTime:.1f}s")
+            if self.inference is not None:
+                print(f"Inference ({self.name}): {self.inference.streamMetrics(self.name)}")
+                self.inference.forget(self.name)
+            summary = self.engine.summary()
+            print(f"Workout stopped: {summary}")
+            return summary
+
+    def encoderMetrics(self):
+        """FFmpeg progress metrics of the running workout's stream, {} if none is running."""
+        writer = self.writer
+        return writer.encoderMetrics() if writer is not None else {}
+
+    def pause(self):
+        self.paused = True
+        if self.engine is not None:
+            self.engine.feedback = "Paused"
+
+    def resume(self):
+        self.paused = False
+        if self.engine is not None:
+            self.engine.feedback = "Resumed"
+
+    def progress(self):
+        """Live state of the current (or last) workout."""
+        engine = self.engine
+        if engine is None:
+            return {}
+        return {
+            "exercise": engine.spec.name,
+            "phase": engine.phase,
+            "count": engine.count,
+            "attempts": engine.attempts,
+            "success_rate": engine.successRate,
+            "paused": self.paused,
+        }
+
+    def releaseCamera(self):
+        """Closes the camera between workouts, e.g. so another station can open it."""
+        if self.cap is not None and self.pipeline is None:
+            self.cap.release()
+            self.cap = None
+
+    def close(self):
+        self.stop()
+        self.releaseCamera()
+        self.voice.stop()
+
+    def show(self, until=None):
+        """
+        Displays the annotated frames until the workout ends, 'q' is pressed
+        or the threading.Event until is set. Returns True if 'q' was pressed.
+        """
+        title = self.engine.spec.title
+        cv2.namedWindow(title, cv2.WND_PROP_FULLSCREEN)
+        cv2.setWindowProperty(title, cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        lastMetrics = time.time()
+        pipeline = self.pipeline
+        try:
+            while until is None or not until.is_set():
+                try:
+                    img = pipeline.output.get(timeout=1)
+                except queue.Empty:
+                    continue
+                if img is None:  # A stage stopped the pipeline
+                    break
+                cv2.imshow(title, img)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    print("Exit signal received ('q' pressed).")
+                    return True
+
+                # Log which stage is limiting throughput
+                if time.time() - lastMetrics > 10:
+                    print(f"Pipeline: {pipeline.summary()}")
+                    print(f"Stream: {self.writer.metrics()}")
+                    print(f"Encoder: {self.writer.encoderMetrics()}")
+                    if self.inference is not None:
+                        print(f"Inference: {self.inference.summary()}")
+                    lastMetrics = time.time()
+        finally:
+            cv2.destroyAllWindows()
+        return False
+
+    def _startFfmpeg(self):
+        command = sm.buildFfmpegCommand(self.output, size=self.size, fps=self.fps,
+                                        pixFmt=self.pixFmt, profile=self.profile,
+                                        audioDevice=self.audioDevice)
+        process = sm.startFfmpeg(command)
+        print("FFmpeg process initialized.")
+        return process
+
+    def _capture(self, _):
+        """Pipeline source: hands the newest camera frame to the pose stage."""
+        ret, img = self.cap.read()
+        if not ret:
+            # Only once the camera reader stopped, e.g. the device went away
+            print("Camera stopped delivering frames")
+            return plm.STOP
+        return img
+
+    def _process(self, img):
+        """Pipeline stage: pose detection, rep counting and HUD drawing."""
+        engine = self.engine
+        if self.inference is not None:
+            # Waits for a shared worker; this stage never has more than one frame queued
+            lmList = self.inference.run(self.name, self._detect, img)
+        else:
+            lmList = self._detect(img)
+
+        if len(lmList) != 0 and not self.paused:
+            # Every angle the spec uses, evaluated in one pass
+            angles = self.detector.findAngles(engine.triplets)
+            self.detector.drawAngles(img, engine.triplets, angles)
+            self._announce(engine.update(angles))
+        if len(lmList) != 0 or self.paused:
+            drawHud(img, engine)
+
+        drawStatus(img, self.detector, self.writer)
+        return img
+
+    def _detect(self, img):
+        """Pose inference on img; returns the landmark array of findPosition."""
+        self.detector.findPose(img, False)
+        return self.detector.findPosition(img, False, asArray=True)
+
+    def _announce(self, events):
+        """Turns the rep events of one frame into voice feedback."""
+        spec = self.engine.spec
+        for kind, value in events:
+            if kind == 'rep' and spec.encouragement and value % 5:
+                self.voice.say(np.random.choice(spec.encouragement))
+            elif kind == 'invalid' and spec.invalid:
+                self.voice.say(np.random.choice(spec.invalid))
+            elif kind == 'speak':
+                self.voice.say(value)
+            if self.onEvent is not None and kind != 'speak':
+                self.onEvent(kind, value, self.progress())
+
+    def _stream(self, img):
+        """Pipeline stage: queues the annotated frame for FFmpeg."""
+        self.writer.write(img)
+        # Only hand frames on when someone displays them
+        return img if self.display else None
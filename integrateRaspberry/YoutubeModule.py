@@ -0,0 +1,133 @@
+"""
+Process-wide YouTube Data API client. It is built once from a static
+discovery document (no discovery round-trip), reused by every request,
+and its OAuth token is refreshed in the background before it expires, so
+no request ever waits on a token refresh or an OAuth flow.
+
+Setting YOUTUBE_API_ROOT (e.g. http://localhost:8085/) points the client
+at a local stand-in server such as youtube_standin.py; without a token
+file it then sends no credentials at all. YOUTUBE_TOKEN_URI does the same
+for token refreshes (e.g. http://localhost:8085/token).
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from googleapiclient.discovery import build, build_from_document
+
+SCOPES = ["https://www.googleapis.com/auth/youtube.force-ssl"]
+
+class youtubeClient() :
+    """
+    Lazily built, shared YouTube service.
+
+    discoveryFile is an optional local copy of the youtube v3 discovery
+    document; by default the copy bundled with google-api-python-client is
+    used. The refresh thread renews the token refreshMargin seconds before
+    it expires. execute() serializes API calls, since the underlying HTTP
+    connection is not thread-safe.
+    """
+
+    def __init__(self, clientSecretsFile=None, tokenFile=None, scopes=SCOPES,
+                 discoveryFile=None, apiRoot=None, tokenUri=None, refreshMargin=300):
+        self.clientSecretsFile = clientSecretsFile
+        self.tokenFile = tokenFile
+        self.scopes = scopes
+        self.discoveryFile = discoveryFile
+        self.apiRoot = apiRoot
+        self.tokenUri = tokenUri
+        self.refreshMargin = refreshMargin
+        self.credentials = None
+        self.refreshes = 0
+        self._service = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._refresher = None
+
+    def service(self):
+        """Returns the shared service, building it on first use."""
+        with self._lock:
+            if self._service is None:
+                self.credentials = self._loadCredentials()
+                self._service = self._build(self.credentials)
+                if isinstance(self.credentials, Credentials) and self.credentials.refresh_token:
+                    self._refresher = threading.Thread(target=self._refreshLoop, daemon=True)
+                    self._refresher.start()
+            return self._service
+
+    def execute(self, request):
+        """Executes a request built from service(), one call at a time."""
+        with self._lock:
+            return request.execute()
+
+    def close(self):
+        self._stop.set()
+
+    def _build(self, credentials):
+        options = {"api_endpoint": self.apiRoot} if self.apiRoot else None
+        if self.discoveryFile:
+            with open(self.discoveryFile) as f:
+                return build_from_document(f.read(), credentials=credentials, client_options=options)
+        return build('youtube', 'v3', credentials=credentials, client_options=options,
+                     static_discovery=True)
+
+    def _loadCredentials(self):
+        credentials = None
+        if self.tokenFile and os.path.exists(self.tokenFile):
+            credentials = Credentials.from_authorized_user_file(self.tokenFile, self.scopes)
+            if self.tokenUri:
+                # The copy made by with_token_uri loses the expiry
+                expiry = credentials.expiry
+                credentials = credentials.with_token_uri(self.tokenUri)
+                credentials.expiry = expiry
+        elif self.apiRoot:
+            # A local stand-in does not check credentials
+            return AnonymousCredentials()
+
+        if credentials and not credentials.valid and credentials.refresh_token:
+            credentials.refresh(Request())
+            self._saveCredentials(credentials)
+
+        # Only without a usable refresh token does the interactive flow run
+        if not credentials or not credentials.valid:
+            print("No valid credentials found. Starting OAuth flow...")
+            flow = InstalledAppFlow.from_client_secrets_file(self.clientSecretsFile, self.scopes)
+            credentials = flow.run_local_server(port=8080, prompt='consent')
+            self._saveCredentials(credentials)
+        return credentials
+
+    def _saveCredentials(self, credentials):
+        if not self.tokenFile:
+            return
+        tmp = f"{self.tokenFile}.tmp"
+        with open(tmp, 'w') as token:
+            token.write(credentials.to_json())
+        os.replace(tmp, self.tokenFile)
+
+    def _secondsUntilRefresh(self):
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return 3600
+        # google-auth keeps expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return max((expiry - now - timedelta(seconds=self.refreshMargin)).total_seconds(), 0)
+
+    def _refreshLoop(self):
+        retry = 30
+        while not self._stop.wait(self._secondsUntilRefresh()):
+            try:
+                with self._lock:
+                    self.credentials.refresh(Request())
+                self._saveCredentials(self.credentials)
+                self.refreshes += 1
+                retry = 30
+                print(f"YouTube token refreshed, valid until {self.credentials.expiry}")
+            except Exception as e:
+                print(f"YouTube token refresh failed, retrying in {retry}s: {e}")
+                if self._stop.wait(retry):
+                    break
+                retry = min(retry * 2, 600)
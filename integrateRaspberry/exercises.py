@@ -0,0 +1,182 @@
+"""
+Exercise specs for ExerciseModule. Adding an exercise means adding a spec
+here and registering it in EXERCISES; workout.py does the rest.
+"""
+
+from ExerciseModule import exerciseSpec, transition, formCheck
+
+PUSHUPS = exerciseSpec(
+    name='pushups',
+    title='Pushup counter',
+    angles={
+        'right_elbow': (11, 13, 15),
+        'right_shoulder': (13, 11, 23),
+        'right_hip': (11, 23, 25),
+        'left_elbow': (12, 14, 16),
+        'left_shoulder': (14, 12, 24),
+        'left_hip': (12, 24, 26),
+    },
+    # Arms straight, body in a plank
+    ready=[('right_elbow', '>', 160), ('right_shoulder', '>', 40), ('right_hip', '>', 160),
+           ('left_elbow', '>', 160), ('left_shoulder', '>', 40), ('left_hip', '>', 160)],
+    start='top',
+    transitions=[
+        transition('top', 'lowering', [('right_elbow', '<', 140), ('left_elbow', '<', 140)],
+                   events=['attempt'], feedback="Go lower"),
+        transition('lowering', 'bottom',
+                   [('right_elbow', '<=', 90), ('right_hip', '>', 160),
+                    ('left_elbow', '<=', 90), ('left_hip', '>', 160)],
+                   feedback="Up"),
+        transition('bottom', 'top',
+                   [('right_elbow', '>', 160), ('right_shoulder', '>', 40), ('right_hip', '>', 160),
+                    ('left_elbow', '>', 160), ('left_shoulder', '>', 40), ('left_hip', '>', 160)],
+                   events=['rep'], feedback="Down"),
+        # Pushed back up without reaching depth with a straight body
+        transition('lowering', 'top', [('right_elbow', '>', 160), ('left_elbow', '>', 160)],
+                   events=['invalid'], feedback="Down"),
+    ],
+    formChecks=[
+        # At the bottom and at the top of the movement
+        formCheck(when=[('right_elbow', '<=', 90)], require=[('right_hip', '>', 160)],
+                  feedback="Keep your body straight", speak=True),
+        formCheck(when=[('right_elbow', '<=', 90)],
+                  require=[('left_elbow', '<=', 90), ('left_hip', '>', 160)],
+                  feedback="Fix Form", speak=True),
+        formCheck(when=[('right_elbow', '>=', 160)], require=[('right_hip', '>', 160)],
+                  feedback="Keep your body straight", speak=True),
+        formCheck(when=[('right_elbow', '>=', 160)],
+                  require=[('right_shoulder', '>', 40), ('left_elbow', '>', 160),
+                           ('left_shoulder', '>', 40), ('left_hip', '>', 160)],
+                  feedback="Fix Form"),
+    ],
+    progress=('right_elbow', 90, 160),
+    symmetry=('right_elbow', 'left_elbow'),
+    encouragement=[
+        "Great push! Keep going strong!",
+        "You're doing awesome—power through it!",
+        "Fantastic push-ups! Stay steady!",
+        "Keep it up; you're building strength!",
+        "Amazing form! Keep pushing!",
+        "You're unstoppable! Almost there!",
+        "Strong push! Stay focused!",
+        "Looking great—keep those reps coming!",
+        "Way to go! Keep that core tight!",
+        "Outstanding effort! You’re crushing it!"
+    ],
+    invalid=[
+        "Almost there! Keep your back straight!",
+        "Not quite—try lowering evenly!",
+        "Focus on your posture and try again!",
+        "You got this! Tighten your core!",
+        "Almost perfect—watch your elbows!",
+        "Adjust your form for a better push!",
+        "Keep your head aligned and try again!",
+        "Nearly there! Lower with control!",
+        "Keep your body steady and try once more!",
+        "Almost right! Maintain a steady motion!"
+    ],
+)
+
+SQUATS = exerciseSpec(
+    name='squats',
+    title='Squat counter',
+    angles={
+        'right_knee': (24, 26, 28),
+        'left_knee': (23, 25, 27),
+        'right_hip': (11, 24, 26),
+        'left_hip': (12, 23, 25),
+        'right_shoulder': (11, 12, 24),
+        'left_shoulder': (12, 11, 23),
+    },
+    # Standing upright
+    ready=[('right_hip', '>', 150), ('left_hip', '>', 150)],
+    start='standing',
+    transitions=[
+        transition('standing', 'descending', [('right_knee', '<', 140), ('left_knee', '<', 140)],
+                   events=['attempt'], feedback="Go down more"),
+        transition('descending', 'bottom', [('right_knee', '<', 100), ('left_knee', '<', 100)],
+                   feedback="Up"),
+        transition('bottom', 'standing', [('right_knee', '>', 160), ('left_knee', '>', 160)],
+                   events=['rep'], feedback="Down"),
+        # Came back up without reaching depth
+        transition('descending', 'standing', [('right_knee', '>', 160), ('left_knee', '>', 160)],
+                   events=['invalid'], feedback="Down"),
+    ],
+    formChecks=[
+        formCheck(phases=('descending', 'bottom'),
+                  require=[('right_knee', '<', 140), ('left_knee', '<', 140)],
+                  feedback="Go down more!!!"),
+    ],
+    symmetry=('right_knee', 'left_knee'),
+    encouragement=[
+        "Great squat form! Keep it up!",
+        "Nice work! Keep pushing!",
+        "You're building strength!",
+        "Excellent squat! Stay steady!",
+        "Fantastic form! Keep going!",
+        "Stay focused and keep up the great work!",
+        "Powerful squat! Stay strong!",
+        "You're getting stronger every rep!",
+        "Amazing depth! Keep it up!",
+        "Strong squat! You're making progress!"
+    ],
+    invalid=[
+        "Almost there! Focus on your form!",
+        "Keep your knees aligned! Try again!",
+        "Watch your posture and squat again!",
+        "Stay balanced! You've got this!",
+        "Nice effort! Adjust your depth!",
+        "Engage your core and try again!",
+        "Keep your back straight!",
+        "Drive through your heels next time!",
+        "Control the movement and try again!",
+        "Almost perfect! Just adjust slightly!"
+    ],
+)
+
+BICEPCURLS = exerciseSpec(
+    name='bicepcurls',
+    title='Bicep curl counter',
+    angles={
+        'right_elbow': (12, 14, 16),
+        'right_shoulder': (14, 12, 24),
+    },
+    ready=[('right_shoulder', '>', 40)],
+    start='extended',
+    transitions=[
+        transition('extended', 'curling', [('right_elbow', '<', 135)],
+                   events=['attempt'], feedback="Attempt Started"),
+        transition('curling', 'curled', [('right_elbow', '<', 45)], feedback="Good curl"),
+        transition('curled', 'extended', [('right_elbow', '>', 135)],
+                   events=['rep'], feedback="Curl Counted"),
+        # Lowered again without a full curl
+        transition('curling', 'extended', [('right_elbow', '>', 135)], events=['invalid']),
+    ],
+    progress=('right_elbow', 45, 135),
+    encouragement=[
+        "Great curl! Keep those reps coming!",
+        "You're nailing it! Keep those biceps working!",
+        "Awesome form! Let's keep building strength!",
+        "Almost there, keep pushing those curls!",
+        "Excellent control! Stay strong, stay focused!",
+        "Perfect tempo! Keep that momentum going!",
+        "Strong work! Your arms are getting stronger!",
+        "Fantastic rep! Feel those biceps burn!",
+        "Keep curling! Each rep is bringing results!",
+        "Way to go! Those arms are looking powerful!"
+    ],
+    invalid=[
+        "Almost there! Keep your elbows steady!",
+        "Not quite there! Try controlling the weight up and down!",
+        "Keep it up! Focus on that full range of motion!",
+        "Check your posture and keep your elbows tucked!",
+        "You’re close! Try a little more control on the lift!",
+        "Slow down and focus on the curl movement!",
+        "Try keeping your wrists straight for more control!",
+        "Remember to lift through the full range - all the way up and down!",
+        "Watch your form and avoid swinging your arms!",
+        "Try to keep your body steady and focus on those biceps!"
+    ],
+)
+
+EXERCISES = {spec.name: spec for spec in (PUSHUPS, SQUATS, BICEPCURLS)}
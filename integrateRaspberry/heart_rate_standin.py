@@ -0,0 +1,78 @@
+"""
+Stand-in heart rate sensor for trying and load testing the server without
+a real chest strap. It sends a plausible heart rate (warming up towards
+about 140 bpm, with noise) to a running session at a fixed rate.
+
+Usage: python heart_rate_standin.py <session_id|current> [rate in Hz] [target]
+       target is http://localhost:5000 (default) or udp://localhost:5005
+       (the server's HEART_RATE_UDP_PORT)
+"""
+
+import json
+import random
+import socket
+import sys
+import time
+from urllib.parse import urlparse
+import requests
+
+def simulated_bpm(elapsed, bpm):
+    # Drifts from resting towards a workout heart rate
+    target = 75 + 65 * min(elapsed / 120, 1)
+    return min(max(bpm + (target - bpm) * 0.02 + random.gauss(0, 0.8), 40), 200)
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    session_id = sys.argv[1]
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+    target = urlparse(sys.argv[3] if len(sys.argv) > 3 else "http://localhost:5000")
+
+    if target.scheme == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        address = (target.hostname, target.port or 5005)
+        def send(sample):
+            sock.sendto(json.dumps({"session_id": session_id, **sample}).encode(), address)
+            return True
+    else:
+        # One keep-alive connection for all samples
+        http = requests.Session()
+        url = f"{target.scheme}://{target.netloc}/sessions/{session_id}/heartrate"
+        def send(sample):
+            response = http.post(url, json=sample, timeout=2)
+            if response.status_code != 200:
+                print(f"Server answered {response.status_code}: {response.text.strip()}")
+            return response.status_code == 200
+
+    print(f"Sending {rate:g} samples/s to {target.geturl()} for session {session_id}")
+    started = time.time()
+    next_sample = started
+    bpm = 75.0
+    sent = failed = 0
+    last_report, sent_at_report = started, 0
+    try:
+        while True:
+            bpm = simulated_bpm(time.time() - started, bpm)
+            try:
+                ok = send({"bpm": round(bpm, 1), "timestamp": time.time()})
+            except (OSError, requests.RequestException) as e:
+                print(f"Send failed: {e}")
+                ok = False
+            sent += ok
+            failed += not ok
+
+            now = time.time()
+            if now - last_report >= 5:
+                print(f"{(sent - sent_at_report) / (now - last_report):.1f} samples/s, "
+                      f"{sent} sent, {failed} failed, {bpm:.0f} bpm")
+                last_report, sent_at_report = now, sent
+
+            # Paced against a fixed schedule, so slow sends do not lower the rate
+            next_sample += 1 / rate
+            time.sleep(max(next_sample - time.time(), 0))
+    except KeyboardInterrupt:
+        print(f"Stopped after {sent} samples ({failed} failed)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures how many stations one box can run pose inference for. For 1 to
+N streams it runs every stream through one shared
+InferenceModule.inferencePool, each on its own poseDetector paced like a
+camera at the stream fps, and prints the pool's throughput and the fps each
+stream actually got.
+
+Frames are looped from the given cameras or video files (the first 100
+frames of each), or are blank 1280x720 frames, on which MediaPipe searches
+the full frame every time (the worst case: no ROI, no skipped frames).
+
+Usage: python inference_benchmark.py [streams] [seconds] [source ...]
+       INFERENCE_WORKERS sets the pool size (default: one per core)
+"""
+
+import os
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+import PoseModule as pm
+import CameraModule as cm
+import InferenceModule as im
+
+FPS = 15
+
+def load_frames(source, count=100):
+    cap = cv2.VideoCapture(cm.parseSource(source))
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"Could not read frames from {source}")
+    return frames
+
+def detect(detector, img):
+    detector.findPose(img, False)
+    return detector.findPosition(img, False, asArray=True)
+
+def run_stream(pool, name, detector, frames, until):
+    next_frame = time.perf_counter()
+    i = 0
+    while not until.is_set():
+        pool.run(name, detect, detector, frames[i % len(frames)])
+        i += 1
+        # Paced like a camera; a stream that falls behind takes the next frame
+        # right away instead of catching up on the ones it missed
+        next_frame = max(next_frame + 1 / FPS, time.perf_counter())
+        time.sleep(max(next_frame - time.perf_counter(), 0))
+
+def benchmark(pool, detectors, sources, seconds):
+    until = threading.Event()
+    threads = [threading.Thread(target=run_stream, args=(pool, f"stream {i}", detector, sources[i % len(sources)], until))
+               for i, detector in enumerate(detectors)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    metrics = pool.metrics()
+    until.set()
+    for thread in threads:
+        thread.join()
+    for name in metrics["streams"]:
+        pool.forget(name)
+    return metrics
+
+def main():
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    sources = [load_frames(source) for source in sys.argv[3:]] or \
+        [[np.zeros((720, 1280, 3), dtype=np.uint8)]]
+
+    pool = im.inferencePool(int(os.getenv("INFERENCE_WORKERS", "0")) or None, window=seconds)
+    print(f"{im.availableCores()} cores, {pool.size} inference workers, streams paced at {FPS} fps")
+    # Detectors as the server builds them, warmed up before they are measured
+    detectors = []
+    for _ in range(streams):
+        detector = pm.poseDetector(roi=True, adaptive=True, governor=pm.complexityGovernor(targetFps=FPS))
+        detect(detector, sources[0][0])
+        detectors.append(detector)
+
+    for n in range(1, streams + 1):
+        for detector in detectors[:n]:
+            detector.reset()
+        m = benchmark(pool, detectors[:n], sources, seconds)
+        fps = [s["fps"] for s in m["streams"].values()]
+        latency = max(s["latency_ms"] or 0 for s in m["streams"].values())
+        print(f"{n} stream(s): {m['throughput_fps']:6.1f} inferences/s, {m['utilization']:4.0%} busy, "
+              f"fps per stream {min(fps):5.1f} - {max(fps):5.1f}, inference up to {latency:.1f} ms, "
+              f"models {[d.complexity for d in detectors[:n]]}")
+    pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,8 @@
 import os
+import re
+import json
 import random
-from flask import Flask, jsonify, request
-import subprocess
+from flask import Flask, Response, jsonify, request
 import threading
 import signal
 import time
@@ -10,24 +11,120 @@ import pyttsx3
 from flask_swagger_ui import get_swaggerui_blueprint
 from supabase import create_client
 
-# OAuth 2.0 dependencies
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 from pyngrok import ngrok 
+import StreamModule as sm
+import CameraModule as cm
+import InferenceModule as im
+import WorkoutModule as wm
+import WorkerModule as wkm
+import YoutubeModule as ym
+import OutboxModule as ob
+import HeartRateModule as hrm
+import SessionModule as ssm
+from exercises import EXERCISES
 
 app = Flask(__name__)
-ffmpeg_process = None
-heart_rate_data = []
-heart_rate_thread = None
-workout_active = False
 
 # Load environment variables from .env file
 load_dotenv()
 
+# thread (default): workouts run on a pose model that stays loaded in this
+# process. process: workouts run in worker processes that were started
+# (and loaded their model) ahead of time. subprocess: every workout starts
+# its own worker process.
+WORKOUT_RUNNER = os.getenv("WORKOUT_RUNNER", "thread")
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "1"))
+# Every exercise with a spec in exercises.py
+WORKOUTS = list(EXERCISES)
+# Each station (camera) runs one workout at a time; requests without a
+# station go to DEFAULT_STATION
+DEFAULT_STATION = os.getenv("DEFAULT_STATION", "default")
+
+def station_settings(name):
+    """
+    Parses the comma separated station=value pairs of the variable name. A
+    comma only starts a new pair when a "station=" follows it, so values
+    such as the ALSA device hw:4,1,0 keep theirs.
+    """
+    pairs = re.split(r",(?=\s*[\w.-]+=)", os.getenv(name, ""))
+    return {station.strip(): value.strip() for station, _, value in (pair.partition("=") for pair in pairs)
+            if station.strip() and value.strip()}
+
+# Cameras of the stations, e.g. "bench=0,rack=/dev/video2,door=rtsp://...".
+# A camera is a device index or a path; stations not listed use CAMERA
+# (default 0), and /start can pick another one per workout.
+CAMERA = cm.parseSource(os.getenv("CAMERA", "0"))
+STATION_CAMERAS = {station: cm.parseSource(camera) for station, camera in station_settings("STATION_CAMERAS").items()}
+# Where each station streams to and which ALSA device it records. Stations
+# not listed stream to STREAM_OUTPUT (or YouTube); only DEFAULT_STATION
+# records AUDIO_DEVICE, as an ALSA capture device can only be opened once.
+STATION_OUTPUTS = station_settings("STATION_OUTPUTS")
+STATION_AUDIO = station_settings("STATION_AUDIO")
+# The in-process workouts of all stations share one pool of
+# INFERENCE_WORKERS pose inference threads (default: one per available core)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or None
+workout_runtimes = {}  # station -> WorkoutModule.workoutRuntime
+workout_runtime_lock = threading.Lock()
+worker_pool = None
+inference_pool = None
+
+def station_camera(station):
+    return STATION_CAMERAS.get(station, CAMERA)
+
+def station_stream(station):
+    """The stream output and audio device ('' for none) of station."""
+    audio = wm.defaultAudioDevice() if station == DEFAULT_STATION else ""
+    return STATION_OUTPUTS.get(station) or wm.defaultOutput(), STATION_AUDIO.get(station, audio)
+
+def get_workout_runtime(station=DEFAULT_STATION):
+    """Returns the station's in-process workout runtime, loading the pose model on first use."""
+    global inference_pool
+    with workout_runtime_lock:
+        if inference_pool is None:
+            inference_pool = im.inferencePool(INFERENCE_WORKERS)
+            print(f"Pose inference pool: {inference_pool.size} workers")
+        if station not in workout_runtimes:
+            output, audio = station_stream(station)
+            # /encoder reads the metrics of in-process streams from the runtime itself
+            workout_runtimes[station] = wm.workoutRuntime(camera=station_camera(station), output=output,
+                                                          audioDevice=audio, inference=inference_pool,
+                                                          name=station, statsFile=None)
+        return workout_runtimes[station]
+
+def get_worker_pool():
+    """Returns the pool of warm workout processes, starting it on first use."""
+    global worker_pool
+    with workout_runtime_lock:
+        if worker_pool is None:
+            worker_pool = wkm.workerPool(WORKER_POOL_SIZE)
+        return worker_pool
+
+def start_runner(workout, station, camera, output, audio, stats_file):
+    """
+    Starts the workout on camera, streaming to output with the audio device
+    audio, the way WORKOUT_RUNNER says and returns what runs it, a
+    workoutWorker or a workoutRuntime. Worker processes publish their
+    encoder metrics to stats_file. Raises RuntimeError if it could not start.
+    """
+    if WORKOUT_RUNNER == "subprocess":
+        worker = wkm.workoutWorker()
+        if not worker.ready.wait(60) or worker.closed:
+            worker.terminate()
+            raise RuntimeError("Workout process did not start")
+        return worker.begin(workout, camera, output, audio, stats_file)
+    elif WORKOUT_RUNNER == "process":
+        # A replacement worker starts loading in the background
+        return get_worker_pool().acquire().begin(workout, camera, output, audio, stats_file)
+    runtime = get_workout_runtime(station)
+    # Idle runtimes keep their camera open; let go of it if another station wants it now
+    with workout_runtime_lock:
+        for other in workout_runtimes.values():
+            if other is not runtime and other.camera == camera:
+                other.releaseCamera()
+    return runtime.start(workout, camera, output, audio)
+
 # Initialize the TTS engine
 tts_engine = pyttsx3.init()
 
@@ -40,16 +137,43 @@ def speak_text(text):
     # Start the speak function in a separate thread
     threading.Thread(target=speak).start()
 
-def generate_heart_rate_data():
-    """Generate random heart rate data every 10 seconds."""
-    global heart_rate_data, workout_active
+# Heart rate samples of a session are kept in a ring buffer of
+# HEART_RATE_CAPACITY samples (2 hours at 10 Hz by default). They come from
+# POST /sessions/<id>/heartrate, from UDP datagrams on HEART_RATE_UDP_PORT,
+# or, with HEART_RATE_SIMULATED (the default), from a random reading every
+# HEART_RATE_SIMULATED_INTERVAL seconds.
+HEART_RATE_CAPACITY = int(os.getenv("HEART_RATE_CAPACITY", "72000"))
+HEART_RATE_UDP_PORT = os.getenv("HEART_RATE_UDP_PORT")
+HEART_RATE_SIMULATED = os.getenv("HEART_RATE_SIMULATED", "true").lower() in ("1", "true", "yes")
+HEART_RATE_SIMULATED_INTERVAL = float(os.getenv("HEART_RATE_SIMULATED_INTERVAL", "10"))
+heart_rate_listener = None
+
+# While the workout runs the samples are condensed into HEART_RATE_WINDOW
+# second windows, and only those are stored: at most HEART_RATE_MAX_POINTS
+# rows per workout (picked with LTTB), each with the window's mean bpm, plus
+# heartrate_min/_max/_last with HEART_RATE_SUMMARY_COLUMNS. HEART_RATE_ZONES
+# are the bpm boundaries of the time-in-zone report.
+HEART_RATE_WINDOW = float(os.getenv("HEART_RATE_WINDOW", "10"))
+HEART_RATE_MAX_POINTS = int(os.getenv("HEART_RATE_MAX_POINTS", "500"))
+HEART_RATE_SUMMARY_COLUMNS = os.getenv("HEART_RATE_SUMMARY_COLUMNS", "false").lower() in ("1", "true", "yes")
+HEART_RATE_ZONES = [float(bpm) for bpm in os.getenv("HEART_RATE_ZONES", "").split(",") if bpm.strip()] \
+    or hrm.DEFAULT_ZONES
 
-    while workout_active:
-        # Generate a random heartbeat between 70 and 120 bpm
-        heart_rate = random.randint(70, 120)
-        timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ")  # Current timestamp
-        heart_rate_data.append({"timestamp": timestamp, "heartrate": heart_rate})
-        time.sleep(10)  # Wait for 10 seconds before generating the next reading
+def simulated_heart_rate():
+    # A random heartbeat between 70 and 120 bpm
+    return random.randint(70, 120)
+
+def heart_rate_records(windows):
+    """heartRateAggregator windows as userWorkoutHealth rows."""
+    records = []
+    for i, start in enumerate(windows["start"].tolist()):
+        record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(start)) + f".{int(start % 1 * 1000):03d}Z",
+                  "heartrate": int(round(windows["mean"][i]))}
+        if HEART_RATE_SUMMARY_COLUMNS:
+            record.update(heartrate_min=int(round(windows["min"][i])), heartrate_max=int(round(windows["max"][i])),
+                          heartrate_last=int(round(windows["last"][i])))
+        records.append(record)
+    return records
 
 # youtube live variables
 youtube_stream_key = os.getenv("YOUTUBE_STREAM_KEY")
@@ -58,13 +182,35 @@ youtube_channel_id = os.getenv("YOUTUBE_CHANNEL_ID")
 # OAuth 2.0 setup
 CLIENT_SECRETS_FILE = os.getenv("CLIENT_SECRETS_FILE")
 TOKEN_FILE = os.getenv("TOKEN_FILE")
-SCOPES = ["https://www.googleapis.com/auth/youtube.force-ssl"]
+SCOPES = ym.SCOPES
+
+# Built once and shared by every request. YOUTUBE_DISCOVERY_FILE can point
+# at a local discovery document, YOUTUBE_API_ROOT and YOUTUBE_TOKEN_URI at a
+# stand-in server.
+youtube_client = ym.youtubeClient(CLIENT_SECRETS_FILE, TOKEN_FILE, SCOPES,
+                                  discoveryFile=os.getenv("YOUTUBE_DISCOVERY_FILE"),
+                                  apiRoot=os.getenv("YOUTUBE_API_ROOT"),
+                                  tokenUri=os.getenv("YOUTUBE_TOKEN_URI"))
 
 # supabase variables
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_API_KEY = os.getenv("SUPABASE_API_KEY")
 
 SUPABASE_WORKOUT_TABLE = "userWorkouts"
+# Heart rate readings per insert request; 0 sends a whole workout at once
+HR_INSERT_CHUNK_SIZE = int(os.getenv("HR_INSERT_CHUNK_SIZE", "500"))
+
+# /stop commits the workout and its heart rate readings to a local SQLite
+# outbox, which is synced to Supabase in the background. OUTBOX_KEY_COLUMN
+# optionally names a unique column of userWorkouts that gets the session ID,
+# so that retrying a workout whose insert response was lost is an upsert.
+# Likewise, if userWorkoutHealth has a unique constraint on some columns
+# (e.g. workout_id,timestamp), HEART_RATE_CONFLICT_COLUMNS optionally names
+# them and heart rate rows are upserted on them.
+OUTBOX_FILE = os.getenv("OUTBOX_FILE", "outbox.db")
+OUTBOX_KEY_COLUMN = os.getenv("OUTBOX_KEY_COLUMN")
+HEART_RATE_CONFLICT_COLUMNS = os.getenv("HEART_RATE_CONFLICT_COLUMNS")
+workout_outbox = None
 
 supabase = create_client(SUPABASE_URL, SUPABASE_API_KEY)
 
@@ -88,35 +234,19 @@ supabase = create_client(SUPABASE_URL, SUPABASE_API_KEY)
 # ]
 
 def get_authenticated_service():
-    credentials = None
-    
-    # Check if token.json exists and load credentials
-    if os.path.exists(TOKEN_FILE):
-        credentials = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    # If no valid credentials or credentials are expired, perform OAuth flow
-    if not credentials or not credentials.valid:
-        print("No valid credentials found. Starting OAuth flow...")
-        flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRETS_FILE, SCOPES)
-        credentials = flow.run_local_server(port=8080, prompt='consent')
-
-        # Save credentials to file for future use
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(credentials.to_json())
-
-    # Build the YouTube API client
-    youtube = build('youtube', 'v3', credentials=credentials)
-    return youtube
+    # The token is loaded (or the OAuth flow run) only the first time
+    youtube_client.service()
+    return youtube_client
 
 def get_live_video_url(youtube):
     try:
-        request = youtube.liveBroadcasts().list(
+        request = youtube.service().liveBroadcasts().list(
             part="snippet",
             broadcastType="all",
             broadcastStatus="active",
             maxResults=5
         )
-        response = request.execute()
+        response = youtube.execute(request)
         print(response)
         
         if 'items' in response and len(response['items']) > 0:
@@ -133,22 +263,147 @@ def get_live_video_url(youtube):
         print(f"An HTTP error occurred: {e}")
         return None, None
 
+# Broadcast discovery polls liveBroadcasts().list with exponential backoff
+# in the background, instead of sleeping a fixed 30 seconds in /start
+BROADCAST_POLL_INITIAL = 2  # seconds before the first poll
+BROADCAST_POLL_MAX = 15     # longest wait between two polls
+BROADCAST_TIMEOUT = float(os.getenv("BROADCAST_TIMEOUT", "180"))
+
+# Stream status values of a session's "status"; the last four are final.
+# Its lifecycle is the separate "state" (see SessionModule).
+SESSION_STARTING = "starting"
+SESSION_WAITING = "waiting_for_broadcast"
+SESSION_LIVE = "live"
+SESSION_NO_BROADCAST = "no_broadcast"
+SESSION_ERROR = "error"
+SESSION_STOPPED = "stopped"
+
+session_manager = ssm.sessionManager()
+
+def new_session(workout, station, camera):
+    """
+    Registers a session on station, or raises sessionStateError if the
+    station, its camera, stream output or audio device is busy.
+    """
+    output, audio = station_stream(station)
+    with session_manager.changed:
+        for other in session_manager.stations.values():
+            if other.station == station:
+                continue  # create() refuses a busy station itself
+            if other.info.get("camera") == camera:
+                raise ssm.sessionStateError(f"Camera {camera} is in use by station {other.station}")
+            other_output, other_audio = other.resources.get("stream", (None, None))
+            if other_output == output:
+                raise ssm.sessionStateError(f"Station {other.station} is streaming to the same output; "
+                                            f"set STATION_OUTPUTS for {station}")
+            if audio and other_audio == audio:
+                raise ssm.sessionStateError(f"Audio device {audio} is in use by station {other.station}")
+        session = session_manager.create(workout, station, camera=camera, status=SESSION_STARTING,
+                                         embed_url=None, watch_url=None, polls=0)
+        # Not in the session info: the output may contain the stream key
+        session.resources["stream"] = (output, audio)
+        session.resources["stats_file"] = f"encoder_stats_{session.sessionId}.json"
+    session.resources["heart_rate"] = hrm.heartRateBuffer(HEART_RATE_CAPACITY)
+    session.resources["heart_rate_windows"] = hrm.heartRateAggregator(HEART_RATE_WINDOW, HEART_RATE_ZONES)
+    return session
+
+def find_session(session_id=None, station=None):
+    """The session with session_id, or else the active session of station (or of the default station)."""
+    if session_id and session_id != "current":
+        return session_manager.get(session_id)
+    return session_manager.active(station or DEFAULT_STATION)
+
+def session_status(session):
+    status = session.status()
+    if session.state == ssm.STOPPED and workout_outbox is not None:
+        status["sync"] = workout_outbox.status(session.sessionId)
+    runner = session.resources.get("runner")
+    if runner is not None:
+        # Updated on every rep event of the running workout
+        status["progress"] = runner.progress()
+        if inference_pool is not None and isinstance(runner, wm.workoutRuntime):
+            status["inference"] = inference_pool.streamMetrics(session.station)
+    buffer = session.resources.get("heart_rate")
+    if buffer is not None:
+        session.resources["heart_rate_windows"].update(buffer)
+    status["heart_rate"] = session.resources["heart_rate_windows"].summary()
+    return status
+
+def add_heart_rate(session, message):
+    """
+    Stores the samples of a heart rate message in a running (or paused)
+    session's buffer. Returns how many samples it had and how many the
+    buffer now holds.
+    """
+    if session is None:
+        raise LookupError("Session is not running")
+    times, bpm = hrm.parseSamples(message)
+    # Under the session lock, so no sample lands after /stop's final aggregation
+    with session.lock:
+        buffer = session.resources.get("heart_rate")
+        if buffer is None or session.state not in (ssm.RUNNING, ssm.PAUSED):
+            raise LookupError("Session is not running")
+        buffer.extend(times, bpm)
+        # Fold the samples into windows as they complete, so the buffer never
+        # has to hold more than the open one
+        aggregator = session.resources["heart_rate_windows"]
+        if time.time() - aggregator.updated >= HEART_RATE_WINDOW:
+            aggregator.update(buffer)
+        return len(bpm), len(buffer)
+
+def receive_heart_rate_datagram(message):
+    # Datagrams without a session ID go to the running workout of their
+    # station, or of the default station
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+    add_heart_rate(find_session(message.get("session_id"), message.get("station")), message)
+
+def discover_broadcast(session):
+    """Polls YouTube until the session's broadcast is live, backing off between polls."""
+    session.update(status=SESSION_WAITING)
+    try:
+        youtube = get_authenticated_service()
+    except Exception as e:
+        print(f"Could not connect to YouTube: {e}")
+        session.update(status=SESSION_ERROR, error=str(e))
+        return
+
+    delay = BROADCAST_POLL_INITIAL
+    deadline = time.time() + BROADCAST_TIMEOUT
+    # Returns early as soon as the session is stopped
+    while not session.stopped.wait(delay):
+        youtube_embed_url, youtube_watch_url = get_live_video_url(youtube)
+        if youtube_embed_url and youtube_watch_url:
+            session.update(status=SESSION_LIVE, polls=session.info["polls"] + 1,
+                           embed_url=youtube_embed_url, watch_url=youtube_watch_url)
+            speak_text("The video stream has started successfully.")
+            return
+        session.update(polls=session.info["polls"] + 1)
+        if time.time() + delay > deadline:
+            session.update(status=SESSION_NO_BROADCAST)
+            return
+        delay = min(delay * 2, BROADCAST_POLL_MAX)
+
 # def start_stream():
 #     global ffmpeg_process
 #     ffmpeg_process = subprocess.Popen(ffmpeg_command)
 
-def insert_user_workout(username, startDT, workout, reps, percentage):
+def insert_user_workout(username, startDT, workout, reps, percentage, endDT=None, key=None):
     payload = {
         "username": username,
         "startDT": startDT,
-        "endDT": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "endDT": endDT or time.strftime("%Y-%m-%dT%H:%M:%SZ"),
         "workout": workout,
         "reps": reps,
         "overallAccuracy": percentage
     }
 
     # Insert into Supabase using the client
-    response = supabase.table(SUPABASE_WORKOUT_TABLE).insert(payload).execute()
+    if key and OUTBOX_KEY_COLUMN:
+        payload[OUTBOX_KEY_COLUMN] = key
+        response = supabase.table(SUPABASE_WORKOUT_TABLE).upsert(payload, on_conflict=OUTBOX_KEY_COLUMN).execute()
+    else:
+        response = supabase.table(SUPABASE_WORKOUT_TABLE).insert(payload).execute()
     
     # Check for successful data insertion
     if response.data:
@@ -158,32 +413,84 @@ def insert_user_workout(username, startDT, workout, reps, percentage):
         print(f"Failed to insert record: {response}")
         return {"error": response}
 
-def insert_heart_rate_data(workout_id, heart_rate_data):
-    """Insert heart rate data into the userWorkoutHealth table using Supabase client."""
-    errors = []
-    print(heart_rate_data)
-    
-    for entry in heart_rate_data:
-        payload = {
-            "workout_id": workout_id,
-            "timestamp": entry["timestamp"],
-            "heartrate": entry["heartrate"]
-        }
+def insert_heart_rate_data(workout_id, heart_rate_data, chunk_size=None, on_conflict=None):
+    """
+    Insert heart rate data into the userWorkoutHealth table using Supabase client.
+    Readings are sent as array inserts of chunk_size rows (HR_INSERT_CHUNK_SIZE,
+    0 sends them all in one request), as upserts on the on_conflict columns
+    (HEART_RATE_CONFLICT_COLUMNS) if set, so that resending a chunk does not
+    store it twice. Returns how many rows were inserted and which chunks failed,
+    so one bad chunk does not lose the rest.
+    """
+    if chunk_size is None:
+        chunk_size = HR_INSERT_CHUNK_SIZE
+    if on_conflict is None:
+        on_conflict = HEART_RATE_CONFLICT_COLUMNS
+    rows = [{"workout_id": workout_id, **entry} for entry in heart_rate_data]
+    if chunk_size <= 0:
+        chunk_size = max(len(rows), 1)
 
-        # Insert the heart rate data into the userWorkoutHealth table
-        response = supabase.table("userWorkoutHealth").insert(payload).execute()
-        
-        if not response.data:  # Check if data was not inserted successfully
-            error_message = response.error.message if response.error else "Unknown error"
-            errors.append(f"Failed to insert entry {payload}: {error_message}")
-            print(f"Failed to insert heart rate data: {error_message}")
+    inserted = 0
+    failed = []
+    for first in range(0, len(rows), chunk_size):
+        chunk = rows[first:first + chunk_size]
+        try:
+            table = supabase.table("userWorkoutHealth")
+            response = (table.upsert(chunk, on_conflict=on_conflict) if on_conflict else table.insert(chunk)).execute()
+            error_message = None if response.data else \
+                (response.error.message if getattr(response, "error", None) else "Unknown error")
+        except Exception as e:
+            error_message = str(e)
+
+        if error_message is None:
+            inserted += len(response.data)
         else:
-            print(f"Successfully inserted heart rate entry: {payload}")
+            failed.append({"first": first, "rows": len(chunk), "error": error_message})
+            print(f"Failed to insert heart rate rows {first}-{first + len(chunk) - 1}: {error_message}")
+
+    print(f"Inserted {inserted} of {len(rows)} heart rate entries in "
+          f"{-(-len(rows) // chunk_size)} request(s)")
+    if failed:
+        print("Errors occurred while inserting heart rate data:", failed)
+    return {"inserted": inserted, "total": len(rows), "failed_chunks": failed}
 
-    # If there were any errors, log them
-    if errors:
-        print("Errors occurred while inserting heart rate data:", errors)
 
+def sync_workouts(records, _):
+    """Outbox handler: writes queued workouts, one per request."""
+    results = []
+    for key, payload in records:
+        result = insert_user_workout(key=key, **payload)
+        if "error" in result:
+            raise RuntimeError(f"Workout insert failed: {result['error']}")
+        if result.get("workout_id") is None:
+            # Its heart rate rows could not refer to it; retried (as an
+            # upsert with OUTBOX_KEY_COLUMN) until it comes back with one
+            raise RuntimeError(f"Workout insert returned no workout_id: {result}")
+        results.append({"workout_id": result.get("workout_id")})
+        session = session_manager.get(key)
+        if session is not None:
+            session.update(workout_id=result.get("workout_id"))
+    return results
+
+def sync_heart_rate(records, workout):
+    """Outbox handler: writes one chunk of a synced workout's heart rate readings."""
+    if not workout or workout.get("workout_id") is None:
+        raise RuntimeError("The workout of these heart rate readings has no workout_id")
+    result = insert_heart_rate_data(workout["workout_id"], [entry for _, entry in records], chunk_size=0)
+    if result["failed_chunks"]:
+        raise RuntimeError(result["failed_chunks"][0]["error"])
+
+def get_outbox():
+    """Returns the outbox, starting its sync thread (and resuming earlier syncs) on first use."""
+    global workout_outbox
+    with workout_runtime_lock:
+        if workout_outbox is None:
+            workout_outbox = ob.outbox(OUTBOX_FILE)
+            workout_outbox.addHandler("workout", sync_workouts)
+            workout_outbox.addHandler("heartrate", sync_heart_rate,
+                                      batchSize=HR_INSERT_CHUNK_SIZE if HR_INSERT_CHUNK_SIZE > 0 else 1 << 20)
+            workout_outbox.start()
+        return workout_outbox
 
 def get_ngrok_url():
     try:
@@ -200,89 +507,203 @@ def get_ngrok_url():
 
 @app.route('/start', methods=['POST'])
 def start():
-    global ffmpeg_process, heart_rate_data, heart_rate_thread, workout_active
-
-    # Reset heart rate data and set workout as active
-    heart_rate_data = []
-    workout_active = True
-
     # Get data from the POST request
     data = request.get_json()
-    workout = data.get("workout")  # Either pushups, squats, or bicep curls
+    workout = data.get("workout")  # One of WORKOUTS
+    station = data.get("station") or DEFAULT_STATION
+    camera = data.get("camera")
 
-    if ffmpeg_process is None:
-        # Start the heart rate generation thread
-        heart_rate_thread = threading.Thread(target=generate_heart_rate_data)
-        heart_rate_thread.start()
+    if workout not in WORKOUTS:
+        return jsonify({"message": "Not a valid workout"}), 400
+    if camera is not None and (not isinstance(camera, (int, str)) or isinstance(camera, bool) or camera == ""):
+        return jsonify({"message": "camera must be a device index or path"}), 400
+    camera = cm.parseSource(camera) if camera is not None else station_camera(station)
+    try:
+        session = new_session(workout, station, camera)
+    except ssm.sessionStateError as e:
+        return jsonify({"message": f"Stream is already running: {e}"}), 400
 
-        # Start the workout script
-        if workout in ["pushups", "bicepcurls", "squats"]:
-            ffmpeg_process = subprocess.Popen(['python', f'{workout}.py'], 
-                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        else:
-            workout_active = False  # Stop generating heart rate if workout is invalid
-            return jsonify({"message": "Not a valid workout"}), 400
+    # Start the workout; a stop request for the session waits until it is running
+    with session.lock:
+        try:
+            session.resources["runner"] = start_runner(workout, station, camera, *session.resources["stream"],
+                                                       session.resources["stats_file"])
+        except Exception as e:
+            # The runner has already stopped whatever of it had started
+            session.resources.pop("heart_rate")
+            session.transition(ssm.FAILED, status=SESSION_ERROR, error=str(e))
+            return jsonify({"message": f"Could not start workout: {e}"}), 500
+        session.transition(ssm.RUNNING)
 
-        # Wait for the stream to initialize on YouTube
-        time.sleep(30)  
+    # The embed/watch URLs show up in the session status once YouTube
+    # has picked up the stream
+    threading.Thread(target=discover_broadcast, args=(session,), daemon=True).start()
 
-        youtube = get_authenticated_service()
-        youtube_embed_url, youtube_watch_url = get_live_video_url(youtube)
+    # Simulated readings take the same path as a sensor's
+    if HEART_RATE_SIMULATED:
+        session.resources["heart_rate_sampler"] = hrm.heartRateSampler(
+            simulated_heart_rate, lambda bpm: add_heart_rate(session, {"bpm": bpm}),
+            HEART_RATE_SIMULATED_INTERVAL).start()
 
-        if youtube_embed_url and youtube_watch_url:
-            speak_text("The video stream has started successfully.")
-            return jsonify({"message": "Stream started", "embed_url": youtube_embed_url, "watch_url": youtube_watch_url}), 200
-        else:
-            return jsonify({"message": "Stream started, but no live video found yet"}), 200
-    else:
-        return jsonify({"message": "Stream is already running"}), 400
+    return jsonify({"message": "Stream starting", "session_id": session.sessionId, "station": station,
+                    "camera": camera, "status_url": f"/sessions/{session.sessionId}"}), 202
 
 
 @app.route('/stop', methods=['POST'])
 def stop():
-    global ffmpeg_process, workout_active, heart_rate_data
-    
     data = request.get_json()
     username = data.get("username")
     startDT = data.get("startDT")
     workout = data.get("workout")
-    
-    if ffmpeg_process is not None:
-        workout_active = False  # Stop heart rate generation
-        heart_rate_thread.join()  # Wait for the heart rate thread to finish
-
-        ffmpeg_process.stdin.write(b'q\n')
-        ffmpeg_process.stdin.flush()
-        time.sleep(5)  
-        ffmpeg_process.wait()
-        ffmpeg_process = None
-
-        count = 0
-        success_rate = 0.0
+
+    session = find_session(data.get("session_id"), data.get("station"))
+    if session is None or not session.isActive():
+        return jsonify({"message": "No stream is running"}), 400
+
+    with session.lock:
         try:
-            with open('results.txt', 'r') as f:
-                lines = f.readlines()
-                for line in lines:
-                    if "Count:" in line:
-                        count = int(line.split(":")[1].strip())
-                    elif "Success Rate:" in line:
-                        success_rate = float(line.split(":")[1].strip().replace('%', ''))
-        except FileNotFoundError:
-            return jsonify({"message": "Result file not found"}), 400
-        
-        # Insert the workout data into Supabase and get the workout_id
-        workout_result = insert_user_workout(username, startDT, workout, count, success_rate)
-        workout_id = workout_result.get("workout_id") if workout_result else None
-
-        # Insert heart rate data into the userWorkoutHealth table
-        if workout_id:
-            insert_heart_rate_data(workout_id, heart_rate_data)
-            return jsonify({"message": "Stream stopped, workout and heart rate logged", "payload": workout_result}), 200
-        else:
-            return jsonify({"message": "Insertion into database failed"}), 400
-    else:
+            session.transition(ssm.STOPPING)
+        except ssm.sessionStateError as e:
+            return jsonify({"message": str(e)}), 409
+
+        # Stop heart rate generation; interrupts its wait, so this takes milliseconds
+        sampler = session.resources.pop("heart_rate_sampler", None)
+        if sampler is not None:
+            sampler.stop()
+
+        # A worker returns as soon as it acknowledges with its summary
+        error = "Workout exited without results"
+        try:
+            summary = session.resources.pop("runner").stop()
+        except Exception as e:
+            summary, error = None, f"Could not stop workout: {e}"
+        if summary is None:
+            session.resources.pop("heart_rate")
+            session.transition(ssm.FAILED, status=SESSION_STOPPED, error=error)
+            return jsonify({"message": error}), 500
+        count = summary["count"]
+        success_rate = summary["success_rate"]
+
+        # Only the windowed series moves to the outbox; the raw samples are dropped
+        aggregator = session.resources["heart_rate_windows"]
+        aggregator.update(session.resources.pop("heart_rate"), final=True)
+        heart_rate_data = heart_rate_records(aggregator.series(HEART_RATE_MAX_POINTS))
+        heart_rate_summary = aggregator.summary()
+        session.transition(ssm.STOPPED, status=SESSION_STOPPED, count=count, success_rate=success_rate)
+
+    # Committed locally; the outbox writes the workout and then its heart
+    # rate readings to Supabase in the background
+    workout_record = {
+        "username": username,
+        "startDT": startDT,
+        "endDT": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "workout": workout,
+        "reps": count,
+        "percentage": success_rate,
+    }
+    outbox = get_outbox()
+    outbox.add("workout", session.sessionId, workout_record,
+               children=[("heartrate", entry) for entry in heart_rate_data])
+    return jsonify({"message": "Stream stopped, workout saved and queued for the database",
+                    "session_id": session.sessionId, "payload": workout_record, "heart_rate": heart_rate_summary,
+                    "outbox": outbox.pending()}), 200
+
+def change_pause(pause):
+    """Pauses or resumes the session named in the request; pausing twice is fine."""
+    data = request.get_json(silent=True) or {}
+    session = find_session(data.get("session_id"), data.get("station"))
+    if session is None or not session.isActive():
         return jsonify({"message": "No stream is running"}), 400
 
+    current, target = (ssm.RUNNING, ssm.PAUSED) if pause else (ssm.PAUSED, ssm.RUNNING)
+    with session.lock:
+        if session.state == current:
+            if pause:
+                session.resources["runner"].pause()
+            else:
+                session.resources["runner"].resume()
+            session.transition(target)
+        elif session.state != target:
+            return jsonify({"message": f"Session is {session.state}"}), 409
+    return jsonify({"message": "Workout paused" if pause else "Workout resumed"}), 200
+
+@app.route('/pause', methods=['POST'])
+def pause():
+    return change_pause(True)
+
+
+@app.route('/resume', methods=['POST'])
+def resume():
+    return change_pause(False)
+
+
+@app.route('/sessions/<session_id>/heartrate', methods=['POST'])
+def post_heart_rate(session_id):
+    """Takes one or more heart rate samples of a running session."""
+    session = find_session(session_id, request.args.get("station"))
+    if session is None:
+        return jsonify({"message": "Unknown session"}), 404
+    try:
+        received, buffered = add_heart_rate(session, request.get_json(silent=True))
+    except LookupError as e:
+        return jsonify({"message": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    return jsonify({"received": received, "samples": buffered}), 200
+
+
+@app.route('/workout', methods=['GET'])
+def get_workout_progress():
+    session = find_session(request.args.get("session_id"), request.args.get("station"))
+    runner = session.resources.get("runner") if session is not None else None
+    if runner is not None:
+        return jsonify(runner.progress()), 200
+    else:
+        return jsonify({"message": "No stream is running"}), 404
+
+
+@app.route('/sessions', methods=['GET'])
+def get_sessions():
+    # Running sessions first, then the most recent finished ones
+    listed = sorted(session_manager.list(), key=lambda s: (not s.isActive(), -s.created))
+    if request.args.get("active") in ("1", "true"):
+        listed = [s for s in listed if s.isActive()]
+    return jsonify([session_status(s) for s in listed]), 200
+
+
+@app.route('/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({"message": "Unknown session"}), 404
+    return jsonify(session_status(session)), 200
+
+
+@app.route('/sessions/<session_id>/events', methods=['GET'])
+def get_session_events(session_id):
+    """Server-sent events with the session status, until it is final."""
+    session = session_manager.get(session_id)
+    if session is None:
+        return jsonify({"message": "Unknown session"}), 404
+
+    def stream():
+        version = None
+        while True:
+            with session_manager.changed:
+                session_manager.changed.wait_for(lambda: session.version != version, timeout=15)
+                changed = session.version != version
+                version = session.version
+            if not changed:
+                yield ": keepalive\n\n"
+                continue
+            status = session_status(session)
+            yield f"data: {json.dumps(status)}\n\n"
+            if status["status"] not in (SESSION_STARTING, SESSION_WAITING):
+                break
+
+    return Response(stream(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
+
+
 def run_ngrok():
     # Set up an ngrok tunnel to the Flask app
     public_url = ngrok.connect(5000)  # Exposes port 5000
@@ -297,6 +718,36 @@ def get_url():
         return jsonify({"message": "Unable to get ngrok URL"}), 500
 
 
+@app.route('/outbox', methods=['GET'])
+def get_outbox_status():
+    # Workouts and heart rate readings not yet written to Supabase
+    return jsonify(get_outbox().pending()), 200
+
+
+@app.route('/encoder', methods=['GET'])
+def get_encoder_stats():
+    # Of the session_id or station given, or of the default station. In-process
+    # workouts are asked directly, worker processes publish to their stats file
+    session = find_session(request.args.get("session_id"), request.args.get("station"))
+    runner = session.resources.get("runner") if session is not None else None
+    if isinstance(runner, wm.workoutRuntime):
+        stats = runner.encoderMetrics()
+    else:
+        stats = runner is not None and sm.readEncoderStats(session.resources["stats_file"])
+    if stats:
+        return jsonify(stats), 200
+    else:
+        return jsonify({"message": "No encoder metrics available"}), 404
+
+
+@app.route('/inference', methods=['GET'])
+def get_inference_stats():
+    # How busy the shared pose inference pool is, and the fps of every station
+    if inference_pool is None:
+        return jsonify({"message": "No in-process workout has run yet"}), 404
+    return jsonify({"cores": im.availableCores(), **inference_pool.metrics()}), 200
+
+
 # Swagger setup
 SWAGGER_URL = '/swagger'
 API_URL = '/swagger.json'
@@ -314,7 +765,7 @@ swagger_spec = {
         "/start": {
             "post": {
                 "summary": "Start YouTube stream",
-                "description": "Starts a live YouTube stream with the specified workout type and returns the stream URLs.",
+                "description": "Starts a live YouTube stream with the specified workout type and returns a session ID right away. The stream URLs appear in /sessions/{session_id} once the broadcast is live.",
                 "parameters": [
                     {
                         "name": "workout",
@@ -326,35 +777,135 @@ swagger_spec = {
                             "properties": {
                                 "workout": {
                                     "type": "string",
-                                    "enum": ["pushups", "squats", "bicepcurls"]  
+                                    "enum": WORKOUTS
+                                },
+                                "station": {
+                                    "type": "string",
+                                    "description": "Station (camera) to run the workout on; defaults to DEFAULT_STATION. It streams to its output from STATION_OUTPUTS and records its device from STATION_AUDIO"
+                                },
+                                "camera": {
+                                    "type": "string",
+                                    "description": "Device index (e.g. 0) or path (e.g. /dev/video2) of the camera; defaults to the station's camera from STATION_CAMERAS, or CAMERA"
                                 }
                             }
                         }
                     }
                 ],
                 "responses": {
-                    "200": {
-                        "description": "Stream started successfully",
+                    "202": {
+                        "description": "Stream starting",
                         "schema": {
                             "type": "object",
                             "properties": {
                                 "message": {
                                     "type": "string",
-                                    "example": "Stream started"
+                                    "example": "Stream starting"
+                                },
+                                "session_id": {
+                                    "type": "string"
+                                },
+                                "station": {
+                                    "type": "string"
+                                },
+                                "camera": {
+                                    "type": "string"
+                                },
+                                "status_url": {
+                                    "type": "string",
+                                    "example": "/sessions/SESSION_ID"
+                                }
+                            }
+                        }
+                    },
+                    "400": {
+                        "description": "Not a valid workout, or the station, camera, stream output or audio device is already in use"
+                    },
+                    "500": {
+                        "description": "Workout could not be started"
+                    }
+                }
+            }
+        },
+        "/sessions": {
+            "get": {
+                "summary": "List sessions",
+                "description": "Returns the status of the running sessions of all stations, followed by recently finished ones.",
+                "parameters": [
+                    {"name": "active", "in": "query", "type": "boolean", "description": "Only running sessions"}
+                ],
+                "responses": {
+                    "200": {"description": "Session statuses, as returned by /sessions/{session_id}"}
+                }
+            }
+        },
+        "/sessions/{session_id}": {
+            "get": {
+                "summary": "Get session status",
+                "description": "Returns the status of a workout session and its stream URLs once the broadcast is live.",
+                "parameters": [
+                    {"name": "session_id", "in": "path", "required": True, "type": "string"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Session status fetched successfully",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "session_id": {"type": "string"},
+                                "workout": {"type": "string"},
+                                "station": {"type": "string"},
+                                "state": {
+                                    "type": "string",
+                                    "enum": ["starting", "running", "paused", "stopping", "stopped", "failed"]
+                                },
+                                "status": {
+                                    "type": "string",
+                                    "enum": ["starting", "waiting_for_broadcast", "live", "no_broadcast", "error", "stopped"]
                                 },
                                 "embed_url": {
                                     "type": "string",
-                                    "example": "https://youtube.com/embed/live_stream?channel=CHANNEL_ID"
+                                    "example": "https://youtube.com/embed/VIDEO_ID"
                                 },
                                 "watch_url": {
                                     "type": "string",
                                     "example": "https://youtube.com/watch?v=VIDEO_ID"
+                                },
+                                "polls": {"type": "integer"},
+                                "camera": {"type": "string"},
+                                "progress": {"type": "object"},
+                                "inference": {
+                                    "type": "object",
+                                    "description": "Pose inference of an in-process workout",
+                                    "properties": {
+                                        "fps": {"type": "number"},
+                                        "latency_ms": {"type": "number"},
+                                        "wait_ms": {"type": "number"},
+                                        "frames": {"type": "integer"}
+                                    }
                                 }
                             }
                         }
                     },
-                    "400": {
-                        "description": "Stream is already running"
+                    "404": {
+                        "description": "Unknown session"
+                    }
+                }
+            }
+        },
+        "/sessions/{session_id}/events": {
+            "get": {
+                "summary": "Stream session status",
+                "description": "Server-sent events carrying the session status every time it changes, until the broadcast is live or the session ends.",
+                "produces": ["text/event-stream"],
+                "parameters": [
+                    {"name": "session_id", "in": "path", "required": True, "type": "string"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Event stream"
+                    },
+                    "404": {
+                        "description": "Unknown session"
                     }
                 }
             }
@@ -362,7 +913,7 @@ swagger_spec = {
         "/stop": {
             "post": {
                 "summary": "Stop YouTube stream",
-                "description": "Stops the live YouTube stream and logs the workout in Supabase.",
+                "description": "Stops the session with session_id (or the running session of station, or of the default station) and logs the workout in Supabase.",
                 "parameters": [
                     {
                         "name": "body",
@@ -383,7 +934,9 @@ swagger_spec = {
                                 "workout": {
                                     "type": "string",
                                     "description": "Type of workout (e.g., pushups, squats, bicep curls)"
-                                }
+                                },
+                                "session_id": {"type": "string"},
+                                "station": {"type": "string"}
                             },
                             "required": ["username", "startDT", "workout"]
                         }
@@ -391,23 +944,240 @@ swagger_spec = {
                 ],
                 "responses": {
                     "200": {
-                        "description": "Stream stopped successfully and workout logged",
+                        "description": "Stream stopped, workout saved locally and queued for Supabase",
                         "schema": {
                             "type": "object",
                             "properties": {
                                 "message": {
                                     "type": "string",
-                                    "example": "Stream stopped and workout logged"
+                                    "example": "Stream stopped, workout saved and queued for the database"
+                                },
+                                "session_id": {
+                                    "type": "string",
+                                    "description": "Idempotency key of the workout; GET /sessions/{session_id} shows its sync state and workout_id"
                                 },
                                 "payload": {
-                                    "type": "integer",
-                                    "description": "Database insertion result"
+                                    "type": "object",
+                                    "description": "The saved workout"
+                                },
+                                "heart_rate": {
+                                    "type": "object",
+                                    "description": "Heart rate summary: samples, windows, min, max, mean, last and seconds per zone (time_in_zone)"
+                                },
+                                "outbox": {
+                                    "type": "object",
+                                    "description": "Records still waiting to be written, as returned by GET /outbox"
                                 }
                             }
                         }
                     },
                     "400": {
                         "description": "No stream is running"
+                    },
+                    "409": {
+                        "description": "The session is not running (e.g. already stopping)"
+                    }
+                }
+            }
+        },
+        "/pause": {
+            "post": {
+                "summary": "Pause workout",
+                "description": "Stops counting reps until /resume is called. The stream keeps running.",
+                "parameters": [
+                    {
+                        "name": "body",
+                        "in": "body",
+                        "description": "Session to pause; defaults to the running session of the default station",
+                        "schema": {
+                            "type": "object",
+                            "properties": {"session_id": {"type": "string"}, "station": {"type": "string"}}
+                        }
+                    }
+                ],
+                "responses": {
+                    "200": {"description": "Workout paused"},
+                    "400": {"description": "No stream is running"},
+                    "409": {"description": "The session cannot be paused in its current state"}
+                }
+            }
+        },
+        "/resume": {
+            "post": {
+                "summary": "Resume workout",
+                "description": "Continues counting reps after /pause.",
+                "parameters": [
+                    {
+                        "name": "body",
+                        "in": "body",
+                        "description": "Session to resume; defaults to the running session of the default station",
+                        "schema": {
+                            "type": "object",
+                            "properties": {"session_id": {"type": "string"}, "station": {"type": "string"}}
+                        }
+                    }
+                ],
+                "responses": {
+                    "200": {"description": "Workout resumed"},
+                    "400": {"description": "No stream is running"},
+                    "409": {"description": "The session cannot be resumed in its current state"}
+                }
+            }
+        },
+        "/workout": {
+            "get": {
+                "summary": "Get workout progress",
+                "description": "Returns the live rep count of a running workout.",
+                "parameters": [
+                    {"name": "session_id", "in": "query", "type": "string"},
+                    {"name": "station", "in": "query", "type": "string", "description": "Used without session_id; defaults to the default station"}
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Workout progress fetched successfully",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "exercise": {"type": "string"},
+                                "phase": {"type": "string"},
+                                "count": {"type": "integer"},
+                                "attempts": {"type": "integer"},
+                                "success_rate": {"type": "number"},
+                                "paused": {"type": "boolean"}
+                            }
+                        }
+                    },
+                    "404": {"description": "No workout is running"}
+                }
+            }
+        },
+        "/encoder": {
+            "get": {
+                "summary": "Get encoder metrics",
+                "description": "Returns the latest FFmpeg progress metrics of a running workout stream.",
+                "parameters": [
+                    {
+                        "name": "session_id",
+                        "in": "query",
+                        "type": "string",
+                        "description": "Session to report on; defaults to the running session of the station"
+                    },
+                    {
+                        "name": "station",
+                        "in": "query",
+                        "type": "string",
+                        "description": "Station whose running session to report on; defaults to DEFAULT_STATION"
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Encoder metrics fetched successfully",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "fps": {"type": "number"},
+                                "bitrate_kbps": {"type": "number"},
+                                "speed": {"type": "number"},
+                                "drop_frames": {"type": "integer"},
+                                "dup_frames": {"type": "integer"},
+                                "updated": {"type": "number"}
+                            }
+                        }
+                    },
+                    "404": {
+                        "description": "No workout stream is running"
+                    }
+                }
+            }
+        },
+        "/inference": {
+            "get": {
+                "summary": "Get pose inference metrics",
+                "description": "Returns the throughput of the pose inference pool shared by the in-process workouts of all stations, and the fps, inference latency and queue wait of each station.",
+                "responses": {
+                    "200": {
+                        "description": "Inference metrics fetched successfully",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "cores": {"type": "integer"},
+                                "workers": {"type": "integer"},
+                                "busy_workers": {"type": "integer"},
+                                "queued": {"type": "integer"},
+                                "throughput_fps": {"type": "number"},
+                                "utilization": {"type": "number"},
+                                "streams": {"type": "object", "description": "Metrics per station"}
+                            }
+                        }
+                    },
+                    "404": {
+                        "description": "No in-process workout has run yet"
+                    }
+                }
+            }
+        },
+        "/sessions/{session_id}/heartrate": {
+            "post": {
+                "summary": "Send heart rate samples",
+                "description": "Adds one or more heart rate samples to a running session. Use 'current' as the session ID for the running workout of the station query parameter (or of the default station).",
+                "parameters": [
+                    {
+                        "name": "session_id",
+                        "in": "path",
+                        "required": True,
+                        "type": "string"
+                    },
+                    {
+                        "name": "body",
+                        "in": "body",
+                        "required": True,
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "bpm": {"type": "number", "example": 92},
+                                "timestamp": {"type": "number", "description": "Seconds since the epoch, defaults to now"},
+                                "samples": {
+                                    "type": "array",
+                                    "description": "Several samples at once, each with bpm and optionally timestamp",
+                                    "items": {"type": "object"}
+                                }
+                            }
+                        }
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Samples stored",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "received": {"type": "integer"},
+                                "samples": {"type": "integer", "description": "Samples buffered for the session"}
+                            }
+                        }
+                    },
+                    "400": {"description": "Malformed samples"},
+                    "404": {"description": "Unknown session"},
+                    "409": {"description": "Session is not running"}
+                }
+            }
+        },
+        "/outbox": {
+            "get": {
+                "summary": "Get database sync status",
+                "description": "Returns how many workouts and heart rate readings are still waiting to be written to Supabase.",
+                "responses": {
+                    "200": {
+                        "description": "Outbox status fetched successfully",
+                        "schema": {
+                            "type": "object",
+                            "properties": {
+                                "pending": {"type": "object", "description": "Unsent records per kind"},
+                                "sent": {"type": "integer"},
+                                "failed": {"type": "integer", "description": "Failed sync attempts"},
+                                "last_error": {"type": "string"}
+                            }
+                        }
                     }
                 }
             }
@@ -445,9 +1215,39 @@ def swagger_json():
 
 
 if __name__ == '__main__':
+    # Authorize YouTube now rather than in the first /start
+    threading.Thread(target=get_authenticated_service, daemon=True).start()
+
+    # Find the fastest H.264 encoder in the background; streams use FFmpeg's default until then
+    sm.probeEncoders(wait=False)
+
+    # Load the pose model now rather than on the first /start
+    if WORKOUT_RUNNER == "process":
+        get_worker_pool()
+    elif WORKOUT_RUNNER == "thread":
+        threading.Thread(target=get_workout_runtime, daemon=True).start()
+
+    # Resume syncing workouts saved while the database was unreachable
+    get_outbox()
+
+    if HEART_RATE_UDP_PORT:
+        heart_rate_listener = hrm.udpListener(int(HEART_RATE_UDP_PORT), receive_heart_rate_datagram).start()
+
     # Start ngrok in a separate thread
     ngrok_thread = threading.Thread(target=run_ngrok)
     ngrok_thread.start()
 
     # Start the Flask app
-    app.run(host='0.0.0.0', port=5000)
+    try:
+        app.run(host='0.0.0.0', port=5000)
+    finally:
+        if worker_pool is not None:
+            worker_pool.close()
+        if workout_outbox is not None:
+            workout_outbox.close()
+        if heart_rate_listener is not None:
+            heart_rate_listener.stop()
+        for runtime in workout_runtimes.values():
+            runtime.close()
+        if inference_pool is not None:
+            inference_pool.close()
@@ -0,0 +1,78 @@
+"""
+Measures what streaming costs end to end for every input format in
+StreamModule.PIXEL_FORMATS. Frames are written at the stream fps through
+StreamModule.streamWriter to a real FFmpeg that converts and encodes them
+(with the encoder the stream would use) and throws the result away, so the
+conversion bgr24 leaves to FFmpeg's swscale is counted as well.
+
+Reported per format: the time write() takes in the calling pipeline stage,
+the CPU of this process (conversion, writer thread) and of FFmpeg
+(conversion, encoding) per delivered frame, and how many frames reached
+FFmpeg.
+
+Usage: python stream_benchmark.py [seconds] [fps]
+"""
+
+import resource
+import sys
+import time
+import numpy as np
+import StreamModule as sm
+
+def child_cpu():
+    """CPU seconds of the finished (and waited for) child processes, i.e. FFmpeg."""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def benchmark(pixFmt, frame, seconds, fps):
+    command = sm.buildFfmpegCommand('-', size=(1280, 720), fps=fps, pixFmt=pixFmt)
+    command[-1:] = ['-f', 'null', '-']
+    writer = sm.streamWriter(lambda: sm.startFfmpeg(command), size=(1280, 720), fps=fps,
+                             pixFmt=pixFmt, statsFile=None).open()
+
+    frames = int(seconds * fps)
+    write_time = 0.0
+    cpu_start, child_start = time.process_time(), child_cpu()
+    next_frame = time.perf_counter()
+    for _ in range(frames):
+        start = time.perf_counter()
+        writer.write(frame)
+        write_time += time.perf_counter() - start
+        next_frame += 1 / fps
+        time.sleep(max(next_frame - time.perf_counter(), 0))
+    time.sleep(1)  # let the writer send what is still pending
+    written, dropped = writer.written, writer.dropped
+    writer.close()  # waits for FFmpeg, so its CPU time shows up in RUSAGE_CHILDREN
+
+    delivered = max(written, 1)
+    return {
+        "write_ms": write_time / frames * 1000,
+        "cpu_ms": (time.process_time() - cpu_start) / delivered * 1000,
+        "ffmpeg_cpu_ms": (child_cpu() - child_start) / delivered * 1000,
+        "written": written,
+        "dropped": dropped,
+        "frames": frames,
+    }
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    fps = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    rng = np.random.default_rng(0)
+    inputs = {
+        '1280x720': rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8),
+        '640x480': rng.integers(0, 256, (480, 640, 3), dtype=np.uint8),
+    }
+
+    # Probed up front, so every format is measured with the encoder the stream would use
+    print(f"Encoder: {sm.selectEncoder(wait=True) or 'FFmpeg default'}, {seconds:g}s at {fps} fps per format")
+    for name, frame in inputs.items():
+        print(f"Input {name}")
+        for pixFmt in sm.PIXEL_FORMATS:
+            r = benchmark(pixFmt, frame, seconds, fps)
+            total = r['cpu_ms'] + r['ffmpeg_cpu_ms']
+            print(f"  {pixFmt:8} write() {r['write_ms']:6.3f} ms, CPU per frame {total:6.2f} ms "
+                  f"(this process {r['cpu_ms']:5.2f}, FFmpeg {r['ffmpeg_cpu_ms']:6.2f}), "
+                  f"delivered {r['written']}/{r['frames']}, dropped {r['dropped']}")
+
+if __name__ == "__main__":
+    main()
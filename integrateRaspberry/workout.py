@@ -0,0 +1,108 @@
+"""
+Runs one exercise from the command line with the shared workout runtime.
+The server hosts the same runtime in-process; this entry point is kept for
+running a workout on its own, and as the worker process of
+WORKOUT_RUNNER=process and WORKOUT_RUNNER=subprocess.
+
+Usage: python workout.py <exercise> [camera]
+                                        (e.g. pushups, squats, bicepcurls; camera
+                                         is a device index or path, default 0)
+       python workout.py --worker <fd>  (load the model, then take commands
+                                         over the IpcModule channel on fd)
+"""
+
+import sys
+import threading
+import WorkoutModule as wm
+import CameraModule as cm
+import IpcModule as ipc
+from exercises import EXERCISES
+
+def run(exercise, runtime=None, until=None, camera=0):
+    """Runs one exercise until 'q' is pressed in the window or until is set."""
+    if runtime is None:
+        runtime = wm.workoutRuntime(camera=camera, display=True)
+    try:
+        runtime.start(exercise)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        runtime.close()
+        sys.exit(1)
+
+    summary = None
+    try:
+        runtime.show(until=until)
+    except KeyboardInterrupt:
+        print("Keyboard Interrupt detected.")
+    finally:
+        summary = runtime.stop()
+        runtime.close()
+        print("Resources released, exiting.")
+
+    return summary
+
+def receive_commands(channel, runtime, stop_requested):
+    """Handles stop/pause/resume from the server while the workout runs."""
+    while True:
+        message = channel.recv()
+        if message is None or message.get("type") == "stop":
+            # A closed channel means the server is gone, so stop as well
+            stop_requested.set()
+            break
+        elif message.get("type") == "pause":
+            runtime.pause()
+            channel.send({"type": "paused"})
+        elif message.get("type") == "resume":
+            runtime.resume()
+            channel.send({"type": "resumed"})
+
+def serve_worker(fd):
+    """Loads the pose model, then runs the exercise the server hands over."""
+    channel = ipc.messageChannel.fromFd(fd)
+    # Every rep event goes straight to the server
+    runtime = wm.workoutRuntime(display=True, onEvent=lambda kind, value, progress:
+                                channel.send({"type": kind, "value": value, "progress": progress}))
+    channel.send({"type": "ready"})
+
+    while True:
+        message = channel.recv()
+        if message is None:
+            # The server went away before handing us a workout
+            runtime.close()
+            return
+        if message.get("type") == "start" and message.get("exercise") in EXERCISES:
+            break
+        channel.send({"type": "error", "message": f"Unexpected command: {message}"})
+
+    exercise = message["exercise"]
+    camera = message.get("camera")
+    try:
+        runtime.start(exercise, camera=cm.parseSource(camera) if camera is not None else None,
+                      output=message.get("output"), audioDevice=message.get("audio_device"),
+                      statsFile=message.get("stats_file"))
+    except Exception as e:
+        channel.send({"type": "error", "message": str(e)})
+        runtime.close()
+        return
+    channel.send({"type": "started", "exercise": exercise})
+
+    stop_requested = threading.Event()
+    threading.Thread(target=receive_commands, args=(channel, runtime, stop_requested),
+                     daemon=True).start()
+    try:
+        runtime.show(until=stop_requested)
+    finally:
+        # The summary doubles as the acknowledgement of "stop"
+        summary = runtime.stop()
+        channel.send({"type": "summary", **summary})
+        runtime.close()
+        channel.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--worker':
+        serve_worker(int(sys.argv[2]))
+        sys.exit(0)
+    if len(sys.argv) < 2 or sys.argv[1] not in EXERCISES:
+        print(f"Usage: python workout.py <{'|'.join(EXERCISES)}> [camera]")
+        sys.exit(1)
+    run(sys.argv[1], camera=cm.parseSource(sys.argv[2]) if len(sys.argv) > 2 else 0)
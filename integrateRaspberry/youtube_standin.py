@@ -0,0 +1,49 @@
+"""
+Local stand-in for the parts of the YouTube Data API the server uses, for
+trying the server without a real channel or OAuth token. The broadcast
+goes live a few seconds after start, like a real stream being ingested.
+
+It also answers OAuth token refreshes at /token.
+
+Usage: python youtube_standin.py [seconds until live] [port]
+       then run the server with YOUTUBE_API_ROOT=http://localhost:8085/
+       (and YOUTUBE_TOKEN_URI=http://localhost:8085/token with a token file)
+"""
+
+import sys
+import time
+from flask import Flask, jsonify, request
+
+app = Flask(__name__)
+started = time.time()
+live_after = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+requests_seen = 0
+token_lifetime = 3600
+
+@app.route('/youtube/v3/liveBroadcasts', methods=['GET'])
+def list_live_broadcasts():
+    global requests_seen
+    requests_seen += 1
+    print(f"liveBroadcasts.list #{requests_seen} {dict(request.args)}")
+
+    items = []
+    if time.time() - started >= live_after:
+        items.append({
+            "kind": "youtube#liveBroadcast",
+            "id": "standin-video",
+            "snippet": {
+                "title": "Stand-in workout",
+                "actualStartTime": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(started + live_after)),
+            },
+        })
+    return jsonify({"kind": "youtube#liveBroadcastListResponse", "items": items})
+
+@app.route('/token', methods=['POST'])
+def refresh_token():
+    print(f"Token refresh for client {request.form.get('client_id')}")
+    return jsonify({"access_token": f"standin-{time.time():.0f}", "expires_in": token_lifetime,
+                    "token_type": "Bearer"})
+
+if __name__ == '__main__':
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8085
+    app.run(host='127.0.0.1', port=port)
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+import ExerciseModule as em
+from exercises import EXERCISES, PUSHUPS, SQUATS, BICEPCURLS
+
+
+def pose(spec, default, **angles):
+    """An angles array in the order of spec.angles, default unless given."""
+    return np.array([angles.get(name, default) for name in spec.angles], dtype=np.float32)
+
+
+def run(engine, frames):
+    """Feeds the frames one second apart and returns all events but speech."""
+    events = []
+    for i, angles in enumerate(frames):
+        events += [e for e in engine.update(angles, now=float(i)) if e[0] != 'speak']
+    return events
+
+
+def plank(elbows=170, hips=170):
+    return pose(PUSHUPS, 90, right_elbow=elbows, left_elbow=elbows, right_hip=hips, left_hip=hips)
+
+
+def squat(knees):
+    return pose(SQUATS, 170, right_knee=knees, left_knee=knees)
+
+
+def curl(elbow):
+    return pose(BICEPCURLS, 90, right_elbow=elbow)
+
+
+def test_every_spec_compiles():
+    for name, spec in EXERCISES.items():
+        assert em.exerciseEngine(spec).summary()["exercise"] == name
+
+
+def test_nothing_counts_before_the_ready_position():
+    engine = em.exerciseEngine(SQUATS)
+    bent_over = pose(SQUATS, 90)
+    assert run(engine, [bent_over, bent_over]) == []
+    assert engine.phase == 'standing' and not engine.form
+
+
+def test_squat_rep():
+    engine = em.exerciseEngine(SQUATS)
+    events = run(engine, [squat(170), squat(130), squat(90), squat(130), squat(170)])
+    assert events == [('attempt', 1), ('rep', 1)]
+    assert engine.summary() == {"exercise": "squats", "count": 1, "attempts": 1,
+                                "success_rate": 100.0, "avg_rep_time": 3.0}
+
+
+def test_shallow_squat_is_invalid():
+    engine = em.exerciseEngine(SQUATS)
+    events = run(engine, [squat(170), squat(120), squat(170), squat(90), squat(170)])
+    assert events == [('attempt', 1), ('invalid', 1), ('attempt', 2), ('rep', 1)]
+    assert engine.successRate == 50.0
+
+
+def test_fast_movement_passes_several_phases_in_one_frame():
+    engine = em.exerciseEngine(SQUATS)
+    assert run(engine, [squat(170), squat(90)]) == [('attempt', 1)]
+    assert engine.phase == 'bottom'
+
+
+def test_pushup_rep():
+    engine = em.exerciseEngine(PUSHUPS)
+    events = run(engine, [plank(170), plank(120), plank(85), plank(120), plank(170)])
+    assert events == [('attempt', 1), ('rep', 1)]
+    assert engine.feedback == "Down"
+
+
+def test_half_pushup_is_invalid():
+    engine = em.exerciseEngine(PUSHUPS)
+    events = run(engine, [plank(170), plank(120), plank(170)])
+    assert events == [('attempt', 1), ('invalid', 1)]
+    assert engine.count == 0 and engine.attempts == 1
+
+
+def test_pushup_with_sagging_hips_does_not_reach_the_bottom():
+    engine = em.exerciseEngine(PUSHUPS)
+    events = engine.update(plank(170), now=0) + engine.update(plank(120), now=1) + \
+        engine.update(plank(85, hips=140), now=2)
+    assert engine.phase == 'lowering'
+    assert ('speak', "Keep your body straight") in events
+
+
+def test_bicep_curl_rep_and_partial_curl():
+    engine = em.exerciseEngine(BICEPCURLS)
+    events = run(engine, [curl(170), curl(100), curl(30), curl(170), curl(100), curl(170)])
+    assert events == [('attempt', 1), ('rep', 1), ('attempt', 2), ('invalid', 2)]
+    assert engine.progress == 100.0
+
+
+def test_reset_starts_over():
+    engine = em.exerciseEngine(SQUATS)
+    run(engine, [squat(170), squat(90), squat(170)])
+    engine.reset()
+    assert (engine.count, engine.attempts, engine.phase, engine.form) == (0, 0, 'standing', False)
+
+
+@pytest.mark.parametrize("op, value, holds", [
+    ('>', 90, False), ('>=', 90, True), ('<', 90, False), ('<=', 90, True), ('>', 89, True), ('<', 91, True),
+])
+def test_condition_operators(op, value, holds):
+    conditions = em._conditions([('a', op, value)], {'a': 0})
+    assert conditions.holds(np.array([90], dtype=np.float32)) is holds
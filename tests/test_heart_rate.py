@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+import HeartRateModule as hrm
+
+
+def test_parse_single_and_batched_samples():
+    times, bpm = hrm.parseSamples({"bpm": 80}, now=100.0)
+    assert times.tolist() == [100.0] and bpm.tolist() == [80]
+    times, bpm = hrm.parseSamples({"samples": [{"bpm": 90, "timestamp": 5.5}, {"bpm": 91}]}, now=7.0)
+    assert times.tolist() == [5.5, 7.0] and bpm.tolist() == [90, 91]
+
+
+@pytest.mark.parametrize("message", [[], {"samples": []}, {"bpm": "fast"}, {"timestamp": 1}, {"bpm": 10}, {"bpm": 300}])
+def test_parse_rejects_bad_messages(message):
+    with pytest.raises(ValueError):
+        hrm.parseSamples(message)
+
+
+def test_buffer_overwrites_the_oldest_samples():
+    buffer = hrm.heartRateBuffer(4)
+    for i in range(6):
+        buffer.extend([i], [60 + i])
+    assert len(buffer) == 4 and buffer.overwritten == 2
+    times, bpm, next_read = buffer.read()
+    assert times.tolist() == [2, 3, 4, 5] and bpm.tolist() == [62, 63, 64, 65] and next_read == 6
+
+
+def test_buffer_extend_wraps_and_keeps_the_newest_of_a_large_batch():
+    buffer = hrm.heartRateBuffer(4)
+    buffer.extend([0, 1, 2], [60, 61, 62])
+    buffer.extend([3, 4], [63, 64])
+    assert buffer.read()[0].tolist() == [1, 2, 3, 4]
+    buffer.extend(np.arange(10, 16), np.arange(70, 76))
+    assert buffer.total == 11
+    assert buffer.read()[0].tolist() == [12, 13, 14, 15]
+
+
+def test_read_returns_new_samples_by_write_index_and_skips_overwritten_ones():
+    buffer = hrm.heartRateBuffer(4)
+    buffer.extend([1, 1, 1], [60, 61, 62])
+    times, bpm, next_read = buffer.read()
+    assert bpm.tolist() == [60, 61, 62] and next_read == 3
+    buffer.extend([2, 3, 4, 5, 6], [63, 64, 65, 66, 67])
+    times, bpm, next_read = buffer.read(next_read)
+    # Write index 3 was overwritten before it was read
+    assert bpm.tolist() == [64, 65, 66, 67] and next_read == 8
+    assert len(buffer.read(next_read)[0]) == 0
+
+
+def test_aggregate_windows():
+    times = np.array([0, 1, 9.9, 10, 25, 29])
+    bpm = np.array([60, 80, 70, 100, 90, 95], dtype=np.float32)
+    w = hrm.aggregateWindows(times, bpm, 10)
+    assert w["start"].tolist() == [0, 10, 20]
+    assert w["min"].tolist() == [60, 100, 90]
+    assert w["max"].tolist() == [80, 100, 95]
+    assert w["mean"].tolist() == pytest.approx([70, 100, 92.5])
+    assert w["last"].tolist() == [70, 100, 95]
+    assert w["count"].tolist() == [3, 1, 2]
+    assert hrm.aggregateWindows(times, bpm, 10, origin=5)["start"].tolist() == [-5, 5, 25]
+    assert len(hrm.aggregateWindows(np.zeros(0), np.zeros(0), 10)["start"]) == 0
+
+
+def test_lttb_keeps_the_ends_and_the_peak():
+    x = np.arange(100, dtype=np.float64)
+    y = np.zeros(100)
+    y[37] = 50
+    keep = hrm.lttb(x, y, 10)
+    assert len(keep) == 10
+    assert keep[0] == 0 and keep[-1] == 99 and 37 in keep
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_returns_everything_below_the_threshold():
+    x = np.arange(5, dtype=np.float64)
+    assert hrm.lttb(x, x, 10).tolist() == [0, 1, 2, 3, 4]
+    assert hrm.lttb(x, x, 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_aggregator_counts_every_sample_once_including_equal_timestamps():
+    buffer = hrm.heartRateBuffer(100)
+    aggregator = hrm.heartRateAggregator(window=10)
+    buffer.extend([0, 1, 1], [60, 70, 80])
+    aggregator.update(buffer)
+    buffer.extend([1, 2, 12], [90, 100, 110])
+    aggregator.update(buffer)
+    aggregator.update(buffer)
+    assert aggregator.samples == 6
+    windows = aggregator.windows()
+    assert windows["count"].tolist() == [5]
+    assert windows["mean"].tolist() == pytest.approx([80])
+    aggregator.update(buffer, final=True)
+    assert aggregator.windows()["count"].tolist() == [5, 1]
+    summary = aggregator.summary()
+    assert summary["samples"] == 6 and summary["min"] == 60 and summary["max"] == 110 and summary["last"] == 110
+
+
+def test_aggregator_skips_late_samples_and_sorts_a_batch():
+    buffer = hrm.heartRateBuffer(100)
+    aggregator = hrm.heartRateAggregator(window=10)
+    buffer.extend([5, 3, 4], [65, 63, 64])
+    aggregator.update(buffer)
+    buffer.extend([2], [62])  # older than what was aggregated already
+    aggregator.update(buffer, final=True)
+    assert aggregator.samples == 3
+    assert aggregator.windows()["last"].tolist() == [65]
+
+
+def test_aggregator_time_in_zone_ignores_long_gaps():
+    buffer = hrm.heartRateBuffer(100)
+    aggregator = hrm.heartRateAggregator(window=10, zones=(100, 150), maxGap=15)
+    buffer.extend([0, 10, 20, 60, 70], [90, 120, 160, 90, 90])
+    aggregator.update(buffer, final=True)
+    zones = aggregator.summary()["time_in_zone"]
+    # 0-10 at 90, 10-20 at 120, 20-60 is a gap, 60-70 at 90
+    assert zones == {"zone1": 20.0, "zone2": 10.0, "zone3": 0.0}
+
+
+def test_series_is_downsampled_to_max_points():
+    buffer = hrm.heartRateBuffer(1000)
+    aggregator = hrm.heartRateAggregator(window=1)
+    buffer.extend(np.arange(200, dtype=np.float64), 60 + np.arange(200) % 40)
+    aggregator.update(buffer, final=True)
+    assert len(aggregator.series()["start"]) == 200
+    series = aggregator.series(maxPoints=20)
+    assert len(series["start"]) == 20 and series["start"][0] == 0 and series["start"][-1] == 199
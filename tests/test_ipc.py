@@ -0,0 +1,83 @@
+import socket
+import threading
+import numpy as np
+import pytest
+import IpcModule as ipc
+
+
+@pytest.fixture
+def channels():
+    parent, child = ipc.channelPair()
+    child = ipc.messageChannel(child)
+    yield parent, child
+    parent.close()
+    child.close()
+
+
+def test_messages_arrive_whole_and_in_order(channels):
+    parent, child = channels
+    messages = [{"type": "start", "exercise": "squats"}, {"type": "event", "count": 3}, {}]
+    for message in messages:
+        assert parent.send(message)
+    assert [child.recv() for _ in messages] == messages
+
+
+def test_numpy_scalars_are_sent_as_floats(channels):
+    parent, child = channels
+    parent.send({"angle": np.float32(92.5), "rate": np.float64(0.75)})
+    assert child.recv() == {"angle": 92.5, "rate": 0.75}
+
+
+def test_message_split_across_reads(channels):
+    parent, child = channels
+    data = b'{"type": "stop"}'
+    raw = ipc.HEADER.pack(len(data)) + data
+    received = []
+    reader = threading.Thread(target=lambda: received.append(child.recv()))
+    reader.start()
+    for i in range(len(raw)):
+        parent.sock.sendall(raw[i:i + 1])
+    reader.join(timeout=2)
+    assert received == [{"type": "stop"}]
+
+
+def test_concurrent_sends_do_not_interleave(channels):
+    parent, child = channels
+    payload = "x" * 100000
+    threads = [threading.Thread(target=lambda i=i: [parent.send({"sender": i, "payload": payload}) for _ in range(5)])
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    messages = [child.recv() for _ in range(20)]
+    for thread in threads:
+        thread.join()
+    assert sorted(m["sender"] for m in messages) == sorted(list(range(4)) * 5)
+    assert all(m["payload"] == payload for m in messages)
+
+
+def test_recv_returns_none_once_the_other_side_closes(channels):
+    parent, child = channels
+    parent.send({"type": "result"})
+    parent.close()
+    assert child.recv() == {"type": "result"}
+    assert child.recv() is None
+
+
+def test_recv_returns_none_on_a_truncated_message(channels):
+    parent, child = channels
+    parent.sock.sendall(ipc.HEADER.pack(100) + b'{"type"')
+    parent.sock.shutdown(socket.SHUT_WR)
+    assert child.recv() is None
+
+
+def test_oversized_message_is_refused(channels):
+    parent, child = channels
+    parent.sock.sendall(ipc.HEADER.pack(ipc.MAX_MESSAGE + 1))
+    with pytest.raises(ValueError):
+        child.recv()
+
+
+def test_send_reports_a_closed_peer(channels):
+    parent, child = channels
+    child.close()
+    assert parent.send({"type": "event"}) is False
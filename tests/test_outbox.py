@@ -0,0 +1,118 @@
+import time
+import pytest
+import OutboxModule as ob
+
+
+@pytest.fixture
+def box(tmp_path, monkeypatch):
+    # No jitter, so the backoff can be checked exactly
+    monkeypatch.setattr(ob.random, "uniform", lambda a, b: 1.0)
+    box = ob.outbox(str(tmp_path / "outbox.db"), retryInitial=5, retryMax=30)
+    yield box
+    box.close()
+
+
+class flakyHandler() :
+    """Fails the first failures calls, then returns the key of every record as its result."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+
+    def __call__(self, records, parentResult):
+        self.calls.append((records, parentResult))
+        if len(self.calls) <= self.failures:
+            raise ConnectionError("unreachable")
+        return [{"id": key} for key, _ in records]
+
+
+def sync(box):
+    """Sends every due batch, as the sync thread would."""
+    while (batch := box._nextBatch()) is not None:
+        box._send(*batch)
+
+
+def next_attempt(box, key):
+    return box._db.execute("SELECT next_attempt FROM outbox WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_adding_a_key_twice_is_a_noop(box):
+    assert box.add("workout", "s1", {"reps": 3})
+    assert not box.add("workout", "s1", {"reps": 4})
+    assert box.pending()["pending"] == {"workout": 1}
+
+
+def test_failed_batches_back_off_exponentially_up_to_retry_max(box):
+    handler = flakyHandler(failures=10)
+    box.addHandler("workout", handler)
+    box.add("workout", "s1", {"reps": 3})
+    delays = []
+    for _ in range(4):
+        sent_at = time.time()
+        sync(box)
+        delays.append(next_attempt(box, "s1") - sent_at)
+        # Not due again until the delay has passed
+        assert box._nextBatch() is None
+        box._db.execute("UPDATE outbox SET next_attempt = 0")
+    assert [round(d) for d in delays] == [5, 10, 20, 30]
+    status = box.status("s1")
+    assert status == {"sent": False, "result": None, "attempts": 4, "error": "unreachable"}
+    assert box.failed == 4 and box.lastError == "unreachable"
+
+
+def test_record_is_sent_after_a_retry_and_keeps_its_result(box):
+    handler = flakyHandler(failures=1)
+    box.addHandler("workout", handler)
+    box.add("workout", "s1", {"reps": 3})
+    sync(box)
+    assert not box.status("s1")["sent"]
+    box._db.execute("UPDATE outbox SET next_attempt = 0")
+    sync(box)
+    assert box.status("s1") == {"sent": True, "result": {"id": "s1"}, "attempts": 1, "error": None}
+    assert handler.calls[-1] == ([("s1", {"reps": 3})], None)
+    assert box.pending()["pending"] == {}
+
+
+def test_children_wait_for_their_parent_and_get_its_result(box):
+    workouts = flakyHandler(failures=1)
+    readings = flakyHandler()
+    box.addHandler("workout", workouts).addHandler("heartrate", readings, batchSize=2)
+    box.add("workout", "s1", {"reps": 3}, children=[("heartrate", {"bpm": b}) for b in (80, 90, 100)])
+    sync(box)
+    assert readings.calls == []
+    box._db.execute("UPDATE outbox SET next_attempt = 0")
+    sync(box)
+    assert [len(records) for records, _ in readings.calls] == [2, 1]
+    assert all(parent == {"id": "s1"} for _, parent in readings.calls)
+    assert readings.calls[0][0] == [("s1/0", {"bpm": 80}), ("s1/1", {"bpm": 90})]
+
+
+def test_unhandled_kinds_are_left_alone(box):
+    box.addHandler("workout", flakyHandler())
+    box.add("other", "x", {})
+    assert box._nextBatch() is None and box._nextDue() is None
+
+
+def test_pending_records_survive_a_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    first = ob.outbox(path)
+    first.add("workout", "s1", {"reps": 3})
+    first.close()
+    second = ob.outbox(path)
+    handler = flakyHandler()
+    second.addHandler("workout", handler)
+    sync(second)
+    assert second.status("s1")["sent"]
+    second.close()
+
+
+def test_sync_thread_retries_until_sent(tmp_path):
+    box = ob.outbox(str(tmp_path / "outbox.db"), retryInitial=0.05, retryMax=0.1)
+    handler = flakyHandler(failures=2)
+    box.addHandler("workout", handler).start()
+    box.add("workout", "s1", {"reps": 3})
+    deadline = time.time() + 5
+    while not box.status("s1")["sent"] and time.time() < deadline:
+        time.sleep(0.02)
+    box.close()
+    assert box.sent == 1 and len(handler.calls) == 3
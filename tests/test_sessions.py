@@ -0,0 +1,85 @@
+import threading
+import pytest
+import SessionModule as ssm
+
+
+@pytest.fixture
+def manager():
+    return ssm.sessionManager()
+
+
+def test_lifecycle_through_pause_to_stopped(manager):
+    session = manager.create("squats", "bench", camera=0)
+    assert session.state == ssm.STARTING and session.status()["camera"] == 0
+    for state in (ssm.RUNNING, ssm.PAUSED, ssm.RUNNING, ssm.STOPPING):
+        session.transition(state)
+        assert session.state == state and session.isActive()
+    session.transition(ssm.STOPPED, reps=12)
+    assert not session.isActive() and session.stopped.is_set()
+    assert session.status()["reps"] == 12
+
+
+@pytest.mark.parametrize("path, state", [
+    ((), ssm.PAUSED),
+    ((), ssm.STOPPED),
+    ((ssm.RUNNING,), ssm.STOPPED),
+    ((ssm.RUNNING,), ssm.FAILED),
+    ((ssm.RUNNING, ssm.STOPPING), ssm.RUNNING),
+    ((ssm.FAILED,), ssm.RUNNING),
+    ((ssm.RUNNING, ssm.STOPPING, ssm.STOPPED), ssm.STOPPING),
+])
+def test_transitions_not_in_the_lifecycle_are_refused(manager, path, state):
+    session = manager.create("squats", "bench")
+    for step in path:
+        session.transition(step)
+    before = (session.state, session.version)
+    with pytest.raises(ssm.sessionStateError):
+        session.transition(state)
+    assert (session.state, session.version) == before
+
+
+def test_failed_start_frees_the_station(manager):
+    session = manager.create("squats", "bench")
+    session.transition(ssm.FAILED, error="no camera")
+    assert manager.active("bench") is None
+    assert manager.get(session.sessionId).status()["error"] == "no camera"
+
+
+def test_a_station_runs_one_session_at_a_time(manager):
+    first = manager.create("squats", "bench")
+    with pytest.raises(ssm.sessionStateError):
+        manager.create("pushups", "bench")
+    other = manager.create("pushups", "rack")
+    assert manager.active("bench") is first and manager.active("rack") is other
+    for state in (ssm.RUNNING, ssm.STOPPING, ssm.STOPPED):
+        first.transition(state)
+    again = manager.create("pushups", "bench")
+    assert manager.active("bench") is again and manager.get(first.sessionId) is first
+
+
+def test_updates_wake_up_waiters(manager):
+    session = manager.create("squats", "bench")
+    version = session.version
+    woken = []
+
+    def wait():
+        with manager.changed:
+            woken.append(manager.changed.wait_for(lambda: session.version != version, timeout=2))
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    session.transition(ssm.RUNNING)
+    waiter.join()
+    assert woken == [True]
+
+
+def test_only_the_newest_finished_sessions_are_kept():
+    manager = ssm.sessionManager(keepFinished=2)
+    finished = []
+    for i in range(4):
+        session = manager.create("squats", "bench")
+        session.created = i
+        session.transition(ssm.FAILED)
+        finished.append(session)
+    running = manager.create("squats", "bench")
+    assert set(manager.sessions) == {finished[2].sessionId, finished[3].sessionId, running.sessionId}